@@ -17,14 +17,15 @@ import ast
 class ASTCache:
     """AST 缓存管理器
 
-    基于文件哈希缓存 AST 解析结果，避免重复解析
+    基于文件路径、修改时间和大小缓存 AST 解析结果，避免重复解析；
+    命中缓存时无需读取源文件
     """
 
     # 默认缓存目录
     DEFAULT_CACHE_DIR = ".pysec_cache"
 
     # 缓存版本（当缓存格式变化时更新）
-    CACHE_VERSION = 1
+    CACHE_VERSION = 2
 
     # 默认缓存过期时间（秒）- 7 天
     DEFAULT_EXPIRY = 7 * 24 * 60 * 60
@@ -58,36 +59,37 @@ class ASTCache:
         except OSError:
             self.enabled = False
 
-    def _get_file_hash(self, file_path: str) -> str:
+    def _get_file_signature(self, file_path: str) -> str:
         """
-        计算文件内容的哈希值
+        计算文件的签名（修改时间 + 大小）
+
+        只需一次 stat 调用，无需读取文件内容；文件修改后签名随之变化
 
         Args:
             file_path: 文件路径
 
         Returns:
-            文件内容的 MD5 哈希值
+            形如 "<mtime_ns>_<size>" 的签名，文件不存在时返回空字符串
         """
         try:
-            with open(file_path, "rb") as f:
-                content = f.read()
-                return hashlib.md5(content).hexdigest()
-        except (IOError, OSError):
+            stat = os.stat(file_path)
+        except OSError:
             return ""
+        return f"{stat.st_mtime_ns:x}_{stat.st_size:x}"
 
-    def _get_cache_key(self, file_path: str, file_hash: str) -> str:
+    def _get_cache_key(self, file_path: str, file_signature: str) -> str:
         """
         生成缓存键
 
         Args:
             file_path: 文件路径
-            file_hash: 文件哈希
+            file_signature: 文件签名
 
         Returns:
             缓存键
         """
         path_hash = hashlib.md5(file_path.encode()).hexdigest()[:8]
-        return f"{path_hash}_{file_hash}"
+        return f"{path_hash}_{file_signature}"
 
     def _get_cache_file_path(self, cache_key: str) -> Path:
         """
@@ -114,11 +116,11 @@ class ASTCache:
         if not self.enabled:
             return None
 
-        file_hash = self._get_file_hash(file_path)
-        if not file_hash:
+        file_signature = self._get_file_signature(file_path)
+        if not file_signature:
             return None
 
-        cache_key = self._get_cache_key(file_path, file_hash)
+        cache_key = self._get_cache_key(file_path, file_signature)
 
         # 首先检查内存缓存
         if cache_key in self._memory_cache:
@@ -133,9 +135,11 @@ class ASTCache:
                 with open(cache_file, "rb") as f:
                     cached_data = pickle.load(f)
 
-                # 验证缓存版本
+                # 验证缓存版本，以及路径哈希相同的不同文件
                 if cached_data.get("version") != self.CACHE_VERSION:
                     return None
+                if cached_data.get("file_path") != file_path:
+                    return None
 
                 # 验证缓存是否过期
                 cache_time = cached_data.get("time", 0)
@@ -169,11 +173,11 @@ class ASTCache:
         if not self.enabled:
             return
 
-        file_hash = self._get_file_hash(file_path)
-        if not file_hash:
+        file_signature = self._get_file_signature(file_path)
+        if not file_signature:
             return
 
-        cache_key = self._get_cache_key(file_path, file_hash)
+        cache_key = self._get_cache_key(file_path, file_signature)
         current_time = time.time()
 
         # 更新内存缓存
@@ -190,7 +194,7 @@ class ASTCache:
                 "file_path": file_path,
             }
             with open(cache_file, "wb") as f:
-                pickle.dump(cached_data, f)
+                pickle.dump(cached_data, f, protocol=pickle.HIGHEST_PROTOCOL)
         except (pickle.PickleError, IOError, OSError):
             pass
 
@@ -297,6 +297,17 @@ def handle_command_error(exception: Exception, command: str = None,
     print(f"\n{error_report}", file=sys.stderr)
 
 
+def _non_negative_int(value: str) -> int:
+    """解析非负整数参数（用于 --jobs）"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的整数: {value}")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"不能为负数: {value}")
+    return number
+
+
 def create_parser() -> argparse.ArgumentParser:
     """创建命令行解析器"""
     parser = argparse.ArgumentParser(
@@ -451,6 +462,12 @@ SARIF格式支持 (3.3任务):
         default=None,
         help="单文件扫描超时时间（秒），例如：30 表示30秒"
     )
+    scan_parser.add_argument(
+        "-j", "--jobs",
+        type=_non_negative_int,
+        default=1,
+        help="并行执行规则检测的进程数（默认: 1，即串行；0 表示使用全部 CPU 核心）",
+    )
     # 修复功能参数
     scan_parser.add_argument(
         "--fix",
@@ -634,6 +651,9 @@ def cmd_scan(args):
         if hasattr(scan_config, 'file_timeout'):
             scan_config.file_timeout = args.file_timeout
 
+        # 设置并行进程数
+        scan_config.jobs = (os.cpu_count() or 1) if args.jobs == 0 else args.jobs
+
         # 创建扫描器
         scanner_args = {"config": scan_config}
         
@@ -4,14 +4,16 @@
 负责规则的加载、调度和执行
 """
 
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 from .models import Vulnerability, ScanResult, ScanConfig
 from .scanner import Scanner
 from .rules import RULE_REGISTRY
-from .rules.base import BaseRule
+from .rules.base import AstDispatcher, BaseRule, RuleContext
 from .ignore_handler import IgnoreHandler
 from .severity_adjuster import SeverityAdjuster, ContextInfo, create_context_from_vulnerability
 
@@ -32,6 +34,8 @@ class RuleEngine:
         """
         self.config = config or ScanConfig()
         self.rules: List[BaseRule] = []
+        self._dispatcher = AstDispatcher()
+        self._dispatched_rules = set()
         self._load_rules()
         # 初始化动态严重程度调整器
         self.severity_adjuster = SeverityAdjuster(
@@ -45,9 +49,15 @@ class RuleEngine:
         for rule_id, rule_class in RULE_REGISTRY.items():
             if self.config.should_scan_rule(rule_id):
                 try:
-                    self.rules.append(rule_class())
+                    rule = rule_class()
                 except Exception as e:
                     print(f"加载规则 {rule_id} 失败: {e}")
+                    continue
+                self.rules.append(rule)
+                # 提供节点处理函数的规则共用一次 AST 遍历
+                if rule.visitors():
+                    self._dispatcher.add_rule(rule)
+                    self._dispatched_rules.add(rule_id)
 
     def get_loaded_rules(self) -> List[dict]:
         """获取已加载的规则信息"""
@@ -77,9 +87,19 @@ class RuleEngine:
         """
         vulnerabilities = []
 
+        ctx = RuleContext(ast_tree, file_path, source_code)
+        self._dispatcher.run(ctx)
+
         for rule in self.rules:
             try:
-                results = rule.check(ast_tree, file_path, source_code)
+                if rule.rule_id in ctx.errors:
+                    raise ctx.errors[rule.rule_id]
+                if rule.rule_id in self._dispatched_rules:
+                    results = ctx.findings.get(rule.rule_id)
+                elif rule.applies_to(ctx):
+                    results = rule.check(ast_tree, file_path, source_code)
+                else:
+                    results = None
                 if results:
                     for vuln in results:
                         # 应用严重程度覆盖
@@ -128,6 +148,39 @@ class RuleEngine:
             return [], 0
 
 
+# 并行扫描时每次分发给子进程的文件数
+_PARALLEL_CHUNKSIZE = 16
+
+# 子进程内的扫描器与规则引擎，由 _init_worker 创建
+_worker_scanner: Optional[Scanner] = None
+_worker_engine: Optional[RuleEngine] = None
+
+
+def _init_worker(config: ScanConfig, use_cache: bool):
+    """进程池初始化：每个子进程只加载一次规则"""
+    global _worker_scanner, _worker_engine
+    _worker_scanner = Scanner(use_cache=use_cache)
+    _worker_engine = RuleEngine(config)
+
+
+def _scan_file_worker(
+    file_path: str,
+) -> Tuple[str, Optional[List[Vulnerability]], int, Optional[str]]:
+    """
+    在子进程中解析并检测单个文件
+
+    AST 在子进程内解析，只有检测结果需要回传主进程
+
+    Returns:
+        (文件路径, 漏洞列表, 忽略数量, 错误信息)；无法解析时漏洞列表为 None
+    """
+    tree, source, error = _worker_scanner._parse_file_with_cache(file_path)
+    if error or tree is None:
+        return file_path, None, 0, error
+    vulnerabilities, ignored_count = _worker_engine.scan_ast(tree, file_path, source)
+    return file_path, vulnerabilities, ignored_count, None
+
+
 class SecurityScanner:
     """
     安全扫描器
@@ -163,7 +216,12 @@ class SecurityScanner:
         files_scanned = 0
         total_ignored = 0
 
-        for file_path, ast_tree, source_code, error in self.scanner.scan_target(target):
+        if self.config.jobs > 1 and os.path.isdir(target):
+            file_results = self._scan_parallel(target)
+        else:
+            file_results = self._scan_serial(target)
+
+        for file_path, vulnerabilities, ignored_count, error in file_results:
             files_scanned += 1
 
             # 调用进度回调
@@ -177,11 +235,9 @@ class SecurityScanner:
                     print(f"[错误] {file_path}: {error}")
                 continue
 
-            if ast_tree is None:
+            if vulnerabilities is None:
                 continue
 
-            # 执行规则检测（包含忽略过滤）
-            vulnerabilities, ignored_count = self.engine.scan_ast(ast_tree, file_path, source_code)
             total_ignored += ignored_count
 
             for vuln in vulnerabilities:
@@ -209,6 +265,38 @@ class SecurityScanner:
 
         return result
 
+    def _scan_serial(
+        self, target: str
+    ) -> Iterator[Tuple[str, Optional[List[Vulnerability]], int, Optional[str]]]:
+        """在当前进程中逐个解析并检测文件"""
+        for file_path, ast_tree, source_code, error in self.scanner.scan_target(target):
+            if error or ast_tree is None:
+                yield file_path, None, 0, error
+                continue
+
+            # 执行规则检测（包含忽略过滤）
+            vulnerabilities, ignored_count = self.engine.scan_ast(ast_tree, file_path, source_code)
+            yield file_path, vulnerabilities, ignored_count, None
+
+    def _scan_parallel(
+        self, target: str
+    ) -> Iterator[Tuple[str, Optional[List[Vulnerability]], int, Optional[str]]]:
+        """
+        使用进程池并行检测目录中的文件
+
+        规则检测是纯 Python 的 CPU 密集型计算，多线程受 GIL 限制，
+        因此按文件分发到多个进程；结果按文件顺序返回，与串行扫描一致
+        """
+        file_paths = list(self.scanner.file_scanner.scan_directory(os.path.abspath(target)))
+        self.scanner._total_files = len(file_paths)
+
+        with ProcessPoolExecutor(
+            max_workers=self.config.jobs,
+            initializer=_init_worker,
+            initargs=(self.config, self.scanner.use_cache),
+        ) as pool:
+            yield from pool.map(_scan_file_worker, file_paths, chunksize=_PARALLEL_CHUNKSIZE)
+
     def scan_file(self, file_path: str) -> ScanResult:
         """
         扫描单个文件
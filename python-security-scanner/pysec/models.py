@@ -2,12 +2,17 @@
 数据模型定义
 """
 
+import sys
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Optional
 
 
-@dataclass
+# Python 3.10+ 的 dataclass 支持 slots，大量创建的对象不再各带一个 __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class Vulnerability:
     """漏洞信息数据类"""
 
@@ -132,6 +137,7 @@ class ScanConfig:
     dynamic_severity: bool = False  # 是否启用基于上下文的动态严重程度调整
     upgrade_for_sensitive: bool = True  # 是否为敏感上下文提升严重程度
     downgrade_for_tests: bool = True  # 是否为测试代码降低严重程度
+    jobs: int = 1  # 并行执行规则检测的进程数，1 表示串行
 
     def should_scan_rule(self, rule_id: str) -> bool:
         """判断是否应该执行某个规则"""
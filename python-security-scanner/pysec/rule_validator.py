@@ -5,9 +5,11 @@
 
 import re
 import ast
+import argparse
 import json
 import os
 import sys
+import tempfile
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, field
 from enum import Enum
@@ -33,38 +35,138 @@ class ValidationError:
 
 @dataclass
 class ValidationResult:
-    is_valid: bool = True
     errors: List[ValidationError] = field(default_factory=list)
     valid_rules: int = 0
     total_rules: int = 0
 
+    @property
+    def is_valid(self) -> bool:
+        """没有任何错误即为有效"""
+        return not self.errors
+
     def add_error(self, error: ValidationError):
-        """添加错误并标记为无效"""
-        self.is_valid = False
+        """添加错误（结果随之变为无效）"""
         self.errors.append(error)
 
+# 规则校验结果磁盘缓存
+class RuleValidationCache:
+    """
+    规则校验结果缓存
+
+    以 (路径, 文件大小, mtime) 为键缓存单个规则文件的校验结果，
+    文件未修改时直接复用上次结果，跳过读取和 ast.parse
+    """
+
+    # 缓存版本（当缓存格式变化时更新）
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_file: Optional[str] = None):
+        self.cache_file = cache_file or self.default_cache_file()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def default_cache_file() -> str:
+        """默认缓存文件路径：$XDG_CACHE_HOME/pysec/rules.json，未设置时为 ~/.cache/pysec/rules.json"""
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(cache_home, "pysec", "rules.json")
+
+    def _load(self):
+        """从磁盘加载缓存，文件损坏或版本不符时视为空缓存"""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == self.CACHE_VERSION:
+            self._entries = data.get("entries", {})
+
+    def get(self, file_path: str, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """获取缓存项，文件大小或修改时间不匹配时返回 None"""
+        entry = self._entries.get(os.path.abspath(file_path))
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime_ns:
+            return entry
+        return None
+
+    def set(self, file_path: str, stat: os.stat_result, entry: Dict[str, Any]):
+        """写入缓存项（仅更新内存，调用 save 后落盘）"""
+        entry = dict(entry, size=stat.st_size, mtime=stat.st_mtime_ns)
+        self._entries[os.path.abspath(file_path)] = entry
+        self._dirty = True
+
+    def save(self):
+        """原子写入缓存文件，写入失败时静默忽略"""
+        if not self._dirty:
+            return
+        cache_dir = os.path.dirname(self.cache_file)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"version": self.CACHE_VERSION, "entries": self._entries}, f)
+                os.replace(tmp_path, self.cache_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._dirty = False
+        except OSError:
+            pass
+
+
 # 核心规则验证器
 class RuleValidator:
     """自定义检测规则合法性验证器"""
     
     # 规则必填字段
-    REQUIRED_FIELDS = ["rule_id", "rule_name", "severity", "description", "check_function"]
+    REQUIRED_FIELDS = ("rule_id", "rule_name", "severity", "description", "check_function")
     # 合法的严重程度
-    VALID_SEVERITIES = ["critical", "high", "medium", "low", "info"]
+    VALID_SEVERITIES = frozenset(("critical", "high", "medium", "low", "info"))
+    # 错误信息中展示的合法严重程度（预先拼接，集合本身无序）
+    _VALID_SEVERITIES_DISPLAY = "critical, high, medium, low, info"
     # 规则ID格式正则（如 SQL001、CMD001）
     RULE_ID_PATTERN = re.compile(r"^[A-Z]{3}\d{3}$")
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = False, cache_file: Optional[str] = None):
+        """
+        初始化规则验证器
+
+        Args:
+            use_cache: 是否启用校验结果磁盘缓存（默认关闭，传入 cache_file 时自动启用）
+            cache_file: 缓存文件路径，默认为 $XDG_CACHE_HOME/pysec/rules.json
+        """
         self.result = ValidationResult()
         self.rule_ids: List[str] = []  # 记录已存在的规则ID，防止重复
+        self._cache = RuleValidationCache(cache_file) if use_cache or cache_file else None
+        self._current_rule_id = ""  # 当前文件解析出的规则ID，用于跨文件重复检查
 
     def validate_rule_file(self, file_path: str) -> ValidationResult:
         """验证单个规则文件"""
+        result = self._validate_file(file_path)
+        if self._cache:
+            self._cache.save()
+        return result
+
+    def _validate_file(
+        self, file_path: str, stat: Optional[os.stat_result] = None
+    ) -> ValidationResult:
+        """
+        验证单个规则文件（不落盘缓存），命中缓存时跳过读取和解析
+
+        Args:
+            file_path: 规则文件路径
+            stat: 已获取的文件状态（来自 os.scandir），为 None 时自行 stat
+        """
         # 重置校验结果
         self.result = ValidationResult()
-        
+        self._current_rule_id = ""
+
         # 检查文件是否存在
-        if not os.path.exists(file_path):
+        try:
+            if stat is None:
+                stat = os.stat(file_path)
+        except OSError:
             self.result.add_error(ValidationError(
                 error_type=ValidationErrorType.FILE_NOT_FOUND,
                 rule_id="",
@@ -72,38 +174,96 @@ class RuleValidator:
             ))
             return self.result
 
-        # 读取文件内容
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            lines = content.split("\n")
-            self.result.total_rules = 1  # 单个文件默认1个规则
-            
-        except Exception as e:
+        cached = self._cache.get(file_path, stat) if self._cache else None
+        if cached is not None:
+            self._restore_cached(cached)
+        else:
+            # 读取文件内容
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                lines = content.split("\n")
+                self.result.total_rules = 1  # 单个文件默认1个规则
+
+            except Exception as e:
+                self.result.add_error(ValidationError(
+                    error_type=ValidationErrorType.FILE_NOT_FOUND,
+                    rule_id="",
+                    message=f"读取规则文件失败: {str(e)}"
+                ))
+                return self.result
+
+            # 解析规则（支持Python类/JSON两种格式）
+            if file_path.endswith(".py"):
+                self._validate_python_rule(content, lines, file_path)
+            elif file_path.endswith(".json"):
+                self._validate_json_rule(content, lines, file_path)
+            else:
+                self.result.add_error(ValidationError(
+                    error_type=ValidationErrorType.INVALID_VALUE,
+                    rule_id="",
+                    message=f"不支持的规则文件格式: {os.path.splitext(file_path)[1]}"
+                ))
+
+            if self._cache:
+                self._cache.set(file_path, stat, self._to_cache_entry())
+
+        # 规则ID重复检查依赖其他文件，不能缓存，每次都重新执行
+        self._check_duplicate_rule_id(self._current_rule_id)
+
+        # 验证通过
+        if self.result.is_valid and self.result.total_rules:
+            self.result.valid_rules += 1
+
+        return self.result
+
+    def _check_duplicate_rule_id(self, rule_id: str):
+        """检查规则ID是否与已校验的规则重复"""
+        if not rule_id:
+            return
+        if rule_id in self.rule_ids:
             self.result.add_error(ValidationError(
-                error_type=ValidationErrorType.FILE_NOT_FOUND,
-                rule_id="",
-                message=f"读取规则文件失败: {str(e)}"
+                error_type=ValidationErrorType.DUPLICATE_RULE_ID,
+                rule_id=rule_id,
+                message=f"规则ID重复: {rule_id}"
             ))
-            return self.result
-
-        # 解析规则（支持Python类/JSON两种格式）
-        if file_path.endswith(".py"):
-            self._validate_python_rule(content, lines, file_path)
-        elif file_path.endswith(".json"):
-            self._validate_json_rule(content, lines, file_path)
         else:
+            self.rule_ids.append(rule_id)
+
+    def _to_cache_entry(self) -> Dict[str, Any]:
+        """将当前文件的校验结果转换为可 JSON 序列化的缓存项"""
+        return {
+            "rule_id": self._current_rule_id,
+            "total_rules": self.result.total_rules,
+            "errors": [
+                {
+                    "error_type": error.error_type.name,
+                    "rule_id": error.rule_id,
+                    "message": error.message,
+                    "line": error.line,
+                    "column": error.column,
+                }
+                for error in self.result.errors
+            ],
+        }
+
+    def _restore_cached(self, entry: Dict[str, Any]):
+        """从缓存项恢复校验结果"""
+        self._current_rule_id = entry.get("rule_id", "")
+        self.result.total_rules = entry.get("total_rules", 1)
+        for error in entry.get("errors", []):
             self.result.add_error(ValidationError(
-                error_type=ValidationErrorType.INVALID_VALUE,
-                rule_id="",
-                message=f"不支持的规则文件格式: {os.path.splitext(file_path)[1]}"
+                error_type=ValidationErrorType[error["error_type"]],
+                rule_id=error["rule_id"],
+                message=error["message"],
+                line=error["line"],
+                column=error["column"],
             ))
 
-        return self.result
-
     def validate_rules_dir(self, dir_path: str) -> ValidationResult:
         """验证目录下所有规则文件"""
-        self.result = ValidationResult()
+        dir_result = ValidationResult()
+        self.result = dir_result
         self.rule_ids = []
 
         if not os.path.isdir(dir_path):
@@ -114,18 +274,31 @@ class RuleValidator:
             ))
             return self.result
 
-        # 遍历目录下的规则文件
-        for filename in os.listdir(dir_path):
-            if filename.endswith((".py", ".json")) and not filename.startswith("_"):
-                file_path = os.path.join(dir_path, filename)
-                file_result = self.validate_rule_file(file_path)
-                
-                # 合并结果
-                self.result.is_valid &= file_result.is_valid
-                self.result.errors.extend(file_result.errors)
-                self.result.valid_rules += 1 if file_result.is_valid else 0
-                self.result.total_rules += 1
+        # 遍历目录下的规则文件（DirEntry 自带类型和 stat 信息，避免重复 stat）
+        with os.scandir(dir_path) as it:
+            entries = [
+                entry for entry in it
+                if entry.name.endswith((".py", ".json"))
+                and not entry.name.startswith("_")
+                and entry.is_file()
+            ]
+
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                stat = None
+            file_result = self._validate_file(entry.path, stat)
+
+            # 合并结果
+            dir_result.errors.extend(file_result.errors)
+            dir_result.valid_rules += 1 if file_result.is_valid else 0
+            dir_result.total_rules += 1
+
+        if self._cache:
+            self._cache.save()
 
+        self.result = dir_result
         return self.result
 
     def _validate_python_rule(self, content: str, lines: List[str], file_path: str):
@@ -172,15 +345,7 @@ class RuleValidator:
                     message=f"规则ID格式非法（应为3字母+3数字，如SQL001）: {rule_id}"
                 ))
             
-            # 检查规则ID是否重复
-            if rule_id in self.rule_ids:
-                self.result.add_error(ValidationError(
-                    error_type=ValidationErrorType.DUPLICATE_RULE_ID,
-                    rule_id=rule_id,
-                    message=f"规则ID重复: {rule_id}"
-                ))
-            else:
-                self.rule_ids.append(rule_id)
+            self._current_rule_id = rule_id
 
         # 4. 验证严重程度
         if not severity:
@@ -193,7 +358,7 @@ class RuleValidator:
             self.result.add_error(ValidationError(
                 error_type=ValidationErrorType.INVALID_SEVERITY,
                 rule_id=rule_id,
-                message=f"非法的严重程度: {severity}（合法值：{', '.join(self.VALID_SEVERITIES)}）"
+                message=f"非法的严重程度: {severity}（合法值：{self._VALID_SEVERITIES_DISPLAY}）"
             ))
 
         # 5. 验证check_function是否存在
@@ -204,10 +369,6 @@ class RuleValidator:
                 message="缺失检测函数: check 或 check_function"
             ))
 
-        # 验证通过
-        if self.result.is_valid:
-            self.result.valid_rules += 1
-
     def _validate_json_rule(self, content: str, lines: List[str], file_path: str):
         """验证JSON格式的规则"""
         # 1. 解析JSON
@@ -241,14 +402,7 @@ class RuleValidator:
                     rule_id=rule_id,
                     message=f"规则ID格式非法: {rule_id}"
                 ))
-            if rule_id in self.rule_ids:
-                self.result.add_error(ValidationError(
-                    error_type=ValidationErrorType.DUPLICATE_RULE_ID,
-                    rule_id=rule_id,
-                    message=f"规则ID重复: {rule_id}"
-                ))
-            else:
-                self.rule_ids.append(rule_id)
+            self._current_rule_id = rule_id
 
         # 4. 验证严重程度
         severity = rule_data.get("severity", "").lower()
@@ -259,10 +413,6 @@ class RuleValidator:
                 message=f"非法的严重程度: {severity}"
             ))
 
-        # 验证通过
-        if self.result.is_valid:
-            self.result.valid_rules += 1
-
     def print_validation_report(self, result: ValidationResult):
         """打印校验报告"""
         print("\n📋 规则校验报告")
@@ -279,9 +429,16 @@ class RuleValidator:
                     print(f"   位置: 第{error.line}行，第{error.column}列")
 
 # 便捷使用函数
-def validate_rules(path: str):
-    """便捷校验函数"""
-    validator = RuleValidator()
+def validate_rules(path: str, use_cache: bool = False, cache_file: Optional[str] = None):
+    """
+    便捷校验函数
+
+    Args:
+        path: 规则文件或目录路径
+        use_cache: 是否启用校验结果磁盘缓存（适合 CI、IDE 中反复校验同一目录）
+        cache_file: 缓存文件路径，传入时自动启用缓存
+    """
+    validator = RuleValidator(use_cache=use_cache, cache_file=cache_file)
     
     if os.path.isfile(path):
         result = validator.validate_rule_file(path)
@@ -294,12 +451,23 @@ def validate_rules(path: str):
     validator.print_validation_report(result)
     return result
 
+def main(argv: Optional[List[str]] = None) -> Optional[ValidationResult]:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(
+        prog="rule_validator.py",
+        description="校验自定义漏洞检测规则",
+        epilog="示例: python rule_validator.py ./rules/ --cache",
+    )
+    parser.add_argument("path", help="规则文件/目录路径")
+    parser.add_argument(
+        "--cache", action="store_true",
+        help="启用校验结果磁盘缓存（默认 $XDG_CACHE_HOME/pysec/rules.json）",
+    )
+    parser.add_argument("--cache-file", default=None, help="缓存文件路径（指定时自动启用缓存）")
+    args = parser.parse_args(argv)
+
+    return validate_rules(args.path, use_cache=args.cache, cache_file=args.cache_file)
+
 # 命令行入口
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("使用方法: python rule_validator.py <规则文件/目录路径>")
-        print("示例1: python rule_validator.py ./custom_rule.py")
-        print("示例2: python rule_validator.py ./rules/")
-        sys.exit(1)
-    
-    validate_rules(sys.argv[1])
\ No newline at end of file
+    main()
@@ -0,0 +1,71 @@
+"""
+赋值语句目标的快速匹配
+
+配置类规则（DEBUG、SECRET_KEY、app.config[...] 等）都要判断赋值目标的形状，
+这里集中实现：单目标赋值（绝大多数情况）直接取 targets[0]，
+用 type(x) is C 精确比较代替 isinstance 链
+"""
+
+import ast
+from typing import Tuple
+
+_Name = ast.Name
+_Attribute = ast.Attribute
+_Subscript = ast.Subscript
+_Constant = ast.Constant
+
+
+# const_value 对非常量节点返回的哨兵
+NOT_CONSTANT = object()
+
+
+def const_value(node: ast.AST):
+    """常量节点返回其值，否则返回 NOT_CONSTANT"""
+    return node.value if type(node) is _Constant else NOT_CONSTANT
+
+
+def str_const(node: ast.AST):
+    """字符串常量节点返回其值，否则返回 None"""
+    if type(node) is _Constant:
+        value = node.value
+        if type(value) is str:
+            return value
+    return None
+
+
+def config_key(target: ast.AST):
+    """X.config[K] 形式的目标返回 K，否则返回 None"""
+    if type(target) is _Subscript:
+        value = target.value
+        key = target.slice
+        if type(value) is _Attribute and value.attr == "config" and type(key) is _Constant:
+            return key.value
+    return None
+
+
+def assigned_names(assign: ast.Assign) -> Tuple[str, ...]:
+    """赋值目标中的变量名（NAME = ...）"""
+    targets = assign.targets
+    if len(targets) == 1:
+        target = targets[0]
+        return (target.id,) if type(target) is _Name else ()
+    return tuple(t.id for t in targets if type(t) is _Name)
+
+
+def assigned_attrs(assign: ast.Assign) -> Tuple[str, ...]:
+    """赋值目标中的属性名（obj.attr = ...）"""
+    targets = assign.targets
+    if len(targets) == 1:
+        target = targets[0]
+        return (target.attr,) if type(target) is _Attribute else ()
+    return tuple(t.attr for t in targets if type(t) is _Attribute)
+
+
+def config_keys(assign: ast.Assign) -> Tuple[object, ...]:
+    """赋值目标中的配置键（app.config['KEY'] = ...）"""
+    targets = assign.targets
+    if len(targets) == 1:
+        key = config_key(targets[0])
+        return () if key is None else (key,)
+    keys = (config_key(t) for t in targets)
+    return tuple(k for k in keys if k is not None)
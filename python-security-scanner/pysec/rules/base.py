@@ -3,8 +3,11 @@
 """
 
 import ast
+import re
 from abc import ABC, abstractmethod
-from typing import List
+from collections import defaultdict, deque
+from itertools import accumulate
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple
 
 from ..models import Vulnerability
 
@@ -28,17 +31,444 @@ def register_rule(rule_class):
     return rule_class
 
 
+def keyword_regex(keywords) -> "re.Pattern":
+    """
+    将关键词集合编译为一个正则表达式
+
+    pattern.search(text) 命中当且仅当 text 包含任一关键词，
+    一次扫描代替逐个关键词的 `keyword in text`
+
+    Args:
+        keywords: 关键词集合（按字面匹配）
+
+    Returns:
+        编译后的正则表达式
+    """
+    return re.compile("|".join(re.escape(k) for k in sorted(keywords)))
+
+
+# 不可能包含函数调用的叶子节点类型（含 Load/Store 上下文及运算符节点）
+_CALL_FREE_TYPES = frozenset(
+    [ast.Name, ast.Constant, ast.alias]
+    + ast.expr_context.__subclasses__()
+    + ast.operator.__subclasses__()
+    + ast.unaryop.__subclasses__()
+    + ast.cmpop.__subclasses__()
+    + ast.boolop.__subclasses__()
+)
+
+
+def fast_walk(node: ast.AST) -> Iterator[ast.AST]:
+    """
+    广度优先遍历节点，产出顺序与 ast.walk 完全一致
+
+    ast.walk 每个节点都要经过 iter_child_nodes 和 iter_fields 两层生成器，
+    这里直接按 _fields 读取子节点，省去逐节点的生成器开销
+
+    Args:
+        node: 起始节点
+
+    Yields:
+        AST 节点
+    """
+    AST = ast.AST
+    queue = deque([node])
+    pop = queue.popleft
+    push = queue.append
+    while queue:
+        current = pop()
+        yield current
+        for name in current._fields:
+            value = getattr(current, name, None)
+            if isinstance(value, AST):
+                push(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, AST):
+                        push(item)
+
+
+def iter_calls(node: ast.AST) -> Iterator[ast.Call]:
+    """
+    遍历节点下的所有函数调用
+
+    产出顺序与 ast.walk 一致（广度优先），但不会把不可能包含
+    ast.Call 的叶子节点放入队列，减少只关心调用的规则的遍历开销
+
+    Args:
+        node: 起始节点
+
+    Yields:
+        ast.Call 节点
+    """
+    call_free = _CALL_FREE_TYPES
+    children = ast.iter_child_nodes
+    queue = deque([node])
+    pop = queue.popleft
+    push = queue.append
+    while queue:
+        current = pop()
+        if current.__class__ is ast.Call:
+            yield current
+        for child in children(current):
+            if child.__class__ not in call_free:
+                push(child)
+
+
+def short_call_name(node: ast.Call) -> Optional[str]:
+    """
+    函数调用的简短名称
+
+    f() 返回 "f"，a.b.f() 返回 "f"，其他形式（如 f()()、d[k]()）返回 None
+    """
+    func = node.func
+    func_type = type(func)
+    if func_type is ast.Attribute:
+        return func.attr
+    if func_type is ast.Name:
+        return func.id
+    return None
+
+
+def dotted_name(node: ast.AST) -> Optional[str]:
+    """
+    由变量名与属性访问组成的表达式的完整名称
+
+    a 返回 "a"，a.b.c 返回 "a.b.c"，根部不是变量名（如 f().b、d[k].b）返回 None
+    """
+    parts = []
+    while type(node) is ast.Attribute:
+        parts.append(node.attr)
+        node = node.value
+    if type(node) is not ast.Name:
+        return None
+    parts.append(node.id)
+    parts.reverse()
+    return ".".join(parts)
+
+
+def resolved_name(node: ast.AST, names: Dict[str, str]) -> Optional[str]:
+    """
+    按导入信息展开根部名称后的完整名称
+
+    import xml.etree.ElementTree as ET 之后 ET.parse 返回 "xml.etree.ElementTree.parse"，
+    from xml.sax import parse 之后 parse 返回 "xml.sax.parse"；
+    根部不是导入的名称或来自相对导入（无法确定模块）时返回 dotted_name 的结果
+
+    Args:
+        node: 表达式节点（通常是 ast.Call 的 func）
+        names: 导入信息中的 {绑定名: 完整名称}（见 collect_imports）
+    """
+    name = dotted_name(node)
+    if name is None:
+        return None
+    root, dot, rest = name.partition(".")
+    target = names.get(root)
+    if target is None or target[0] == ".":
+        return name
+    return target + dot + rest
+
+
+class NodeIndex:
+    """
+    AST 节点类型索引
+
+    一次遍历记录全部节点（ast.walk 顺序）并按 type(node) 分桶，
+    只关心少数节点类型的规则直接遍历对应的桶
+    """
+
+    def __init__(self, ast_tree: ast.AST):
+        self.order: List[ast.AST] = list(fast_walk(ast_tree))
+        by_type = defaultdict(list)
+        for node in self.order:
+            by_type[type(node)].append(node)
+        self.by_type: Dict[type, List[ast.AST]] = dict(by_type)
+        self._imports: Optional[dict] = None
+
+    def nodes(self, node_type: type) -> Sequence[ast.AST]:
+        """获取指定类型（精确匹配）的全部节点"""
+        return self.by_type.get(node_type, ())
+
+    @property
+    def imports(self) -> dict:
+        """文件的导入信息（见 collect_imports），第一次使用时收集，之后所有规则共用"""
+        if self._imports is None:
+            self._imports = collect_imports(self)
+        return self._imports
+
+
+# 最近一次构建的索引：同一文件的所有规则共用
+_last_index: Tuple[ast.AST, NodeIndex] = (None, None)
+
+
+def node_index(ast_tree: ast.AST) -> NodeIndex:
+    """
+    获取语法树的节点类型索引
+
+    引擎按文件依次执行所有规则，因此只缓存最近一棵树即可
+    """
+    global _last_index
+    tree, index = _last_index
+    if tree is not ast_tree:
+        index = NodeIndex(ast_tree)
+        _last_index = (ast_tree, index)
+    return index
+
+
+def collect_imports(index: NodeIndex) -> dict:
+    """
+    收集文件中的导入信息
+
+    Returns:
+        {"names": {绑定名: 完整名称}, "from_aliases": {绑定名: (模块, 原名)}}
+    """
+    names = {}
+    from_aliases = {}
+
+    for node in index.nodes(ast.Import):
+        for alias in node.names:
+            names[alias.asname or alias.name] = alias.name
+    for node in index.nodes(ast.ImportFrom):
+        # 相对导入保留开头的点（from .sax import parse 记为 ".sax.parse"），不会被当作同名的绝对模块
+        module = "." * node.level + (node.module or "")
+        prefix = module if module.endswith(".") else module + "."
+        for alias in node.names:
+            name = alias.asname or alias.name
+            from_aliases[name] = (module, alias.name)
+            names[name] = prefix + alias.name
+
+    return {"names": names, "from_aliases": from_aliases}
+
+
+# 最近一次拆分的源代码行：同一文件的所有规则共用
+_last_lines: Tuple[str, List[str]] = (None, None)
+
+
+def split_lines(source_code: str) -> List[str]:
+    """
+    获取 source_code.splitlines() 的结果
+
+    与 node_index 一样只缓存最近一份源代码；返回的列表由各规则共用，不应修改
+    """
+    global _last_lines
+    source, lines = _last_lines
+    if source is not source_code:
+        lines = source_code.splitlines()
+        _last_lines = (source_code, lines)
+    return lines
+
+
+# 最近一次计算的行偏移：同一文件的所有规则共用
+_last_offsets: Tuple[str, List[int]] = (None, None)
+
+
+def line_offsets(source_code: str) -> List[int]:
+    """
+    获取源代码每行的起始偏移
+
+    第 n 行（从 1 开始）为 source_code[offsets[n - 1]:offsets[n] - 1]，
+    列表末尾是 len(source_code) + 1 的哨兵，行数为 len(offsets) - 1。
+    与 node_index 一样只缓存最近一份源代码
+    """
+    global _last_offsets
+    source, offsets = _last_offsets
+    if source is not source_code:
+        offsets = [0]
+        offsets.extend(accumulate(len(line) + 1 for line in source_code.split("\n")))
+        _last_offsets = (source_code, offsets)
+    return offsets
+
+
+class RuleContext:
+    """
+    单个文件的规则执行上下文
+
+    由 AstDispatcher 在一次遍历中传给所有规则的节点处理函数，
+    处理函数通过 add() 上报漏洞，结果按规则ID分组
+    """
+
+    def __init__(self, ast_tree: ast.AST, file_path: str, source_code: str):
+        self.ast_tree = ast_tree
+        self.file_path = file_path
+        self.source_code = source_code
+        self.findings: Dict[str, List[Vulnerability]] = {}
+        self.errors: Dict[str, Exception] = {}
+        self._seen = set()
+        self._cache: Dict[str, object] = {}
+
+    @property
+    def index(self) -> NodeIndex:
+        """当前文件的节点类型索引"""
+        return node_index(self.ast_tree)
+
+    @property
+    def source_lines(self) -> List[str]:
+        """当前文件的源代码行（见 split_lines）"""
+        return split_lines(self.source_code)
+
+    @property
+    def lower_lines(self) -> List[str]:
+        """转为小写的源代码行，同一文件的规则共用"""
+        return self.cached("lower_lines", lambda: [line.lower() for line in self.source_lines])
+
+    @property
+    def imports(self) -> dict:
+        """当前文件的导入信息（见 collect_imports），同一文件的规则共用"""
+        return self.index.imports
+
+    def cached(self, key: str, factory: Callable[[], object]):
+        """
+        获取当前文件的按需计算结果
+
+        处理函数需要的文件级数据（导入表、源代码行等）在第一次使用时
+        由 factory() 计算，之后同一文件的所有处理函数共用
+        """
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = factory()
+            return value
+
+    def add(self, vuln: Vulnerability):
+        """
+        上报一个漏洞
+
+        同一规则在同一位置报告的相同问题只保留一个
+        （如 DEBUG = DEBUG = True 这类多目标赋值）
+        """
+        key = (vuln.rule_id, vuln.line_number, vuln.column, vuln.description)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self.findings.setdefault(vuln.rule_id, []).append(vuln)
+
+
+class AstDispatcher:
+    """
+    AST 单次遍历分发器
+
+    多个规则的节点处理函数按 type(node) 注册到同一张表中，
+    每个文件只遍历一次语法树，用字典查找代替逐规则的 isinstance 判断
+    """
+
+    def __init__(self):
+        self._handlers: Dict[type, List[Tuple[Callable, str]]] = {}
+        self._rules: List["BaseRule"] = []
+        # 声明了 call_names 的规则：{规则ID: 关心的调用名称}
+        self._call_names: Dict[str, FrozenSet[str]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._handlers)
+
+    def register(self, node_type: type, callback: Callable, rule_id: str = ""):
+        """
+        注册节点处理函数
+
+        Args:
+            node_type: AST 节点类型（精确匹配，不含子类）
+            callback: 处理函数，签名为 callback(node, ctx)
+            rule_id: 所属规则ID，用于隔离单个规则的异常
+        """
+        self._handlers.setdefault(node_type, []).append((callback, rule_id))
+
+    def add_rule(self, rule: "BaseRule"):
+        """注册规则 visitors() 返回的全部处理函数"""
+        self._rules.append(rule)
+        if rule.call_names is not None:
+            self._call_names[rule.rule_id] = rule.call_names
+        for node_type, callback in rule.visitors().items():
+            self.register(node_type, callback, rule.rule_id)
+
+    def _active_handlers(self, ctx: RuleContext) -> Dict[type, List[Tuple[Callable, str]]]:
+        """去掉 applies_to() 判定不适用于当前文件的规则"""
+        inactive = {rule.rule_id for rule in self._rules if not rule.applies_to(ctx)}
+        if not inactive:
+            return self._handlers
+        handlers = {}
+        for node_type, entries in self._handlers.items():
+            entries = [entry for entry in entries if entry[1] not in inactive]
+            if entries:
+                handlers[node_type] = entries
+        return handlers
+
+    def run(self, ctx: RuleContext):
+        """
+        遍历语法树并分发节点
+
+        某个规则的处理函数抛出异常后，该规则的后续处理函数不再执行，
+        异常记录在 ctx.errors 中
+        """
+        handlers = self._active_handlers(ctx)
+        if not handlers:
+            return
+        get = handlers.get
+        errors = ctx.errors
+        call_type = ast.Call
+        call_entries, call_names = self._call_filter(handlers)
+        from_aliases = ctx.imports["from_aliases"] if call_names else {}
+        # 按调用名称缓存需要执行的 ast.Call 处理函数，每个名称只筛选一次
+        by_name: Dict[Optional[str], List[Tuple[Callable, str]]] = {}
+        for node in ctx.index.order:
+            node_type = type(node)
+            entries = get(node_type)
+            if entries is None:
+                continue
+            if node_type is call_type and call_names:
+                name = short_call_name(node)
+                entries = by_name.get(name)
+                if entries is None:
+                    # from m import parse as p 导入的别名同时按原名匹配
+                    origin = from_aliases.get(name, (None, name))[1]
+                    entries = by_name[name] = [
+                        entry
+                        for entry in call_entries
+                        if entry[1] not in call_names
+                        or name in call_names[entry[1]]
+                        or origin in call_names[entry[1]]
+                    ]
+            for callback, rule_id in entries:
+                if rule_id in errors:
+                    continue
+                try:
+                    callback(node, ctx)
+                except Exception as e:
+                    errors[rule_id] = e
+
+    def _call_filter(self, handlers):
+        """返回 ast.Call 的处理函数，以及其中声明了 call_names 的规则"""
+        call_entries = handlers.get(ast.Call, ())
+        call_names = {
+            rule_id: self._call_names[rule_id]
+            for _, rule_id in call_entries
+            if rule_id in self._call_names
+        }
+        return call_entries, call_names
+
+
 class BaseRule(ABC):
     """
     检测规则基类
 
-    所有检测规则都应继承此类并实现 check 方法
+    所有检测规则都应继承此类并实现 check 方法。
+    规则不应在遍历语法树的循环中再次遍历子树（嵌套 ast.walk），
+    需要按节点类型查找时使用 node_index，需要检查子树时只遍历一次
+    并合并所有判断
     """
 
+    # 规则只有类属性，不需要实例字典；子类也声明空 __slots__ 才能生效
+    __slots__ = ()
+
     rule_id: str = ""  # 规则ID，如 "SQL001"
     rule_name: str = ""  # 规则名称
     severity: str = "medium"  # 默认严重程度
     description: str = ""  # 规则描述
+    # 规则可能命中时源代码中至少会出现其中之一的文本，为空表示不做文本筛选
+    required_tokens: Tuple[str, ...] = ()
+    # 规则可能命中时源代码必须匹配的正则（用于需要忽略大小写等情况），为空表示不做正则筛选
+    required_pattern: Optional["re.Pattern"] = None
+    # ast.Call 处理函数只关心的调用名称（见 short_call_name），为 None 表示处理所有调用；
+    # 由 AstDispatcher 在调用处理函数前过滤（from 导入的别名按原名匹配），其余调用不会传给该规则
+    call_names: Optional[FrozenSet[str]] = None
 
     @abstractmethod
     def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
@@ -55,11 +485,37 @@ class BaseRule(ABC):
         """
         pass
 
+    def visitors(self) -> Dict[type, Callable]:
+        """
+        返回节点处理函数表 {节点类型: callback(node, ctx)}
+
+        返回非空表的规则由引擎通过 AstDispatcher 与其他规则共用一次遍历，
+        不再单独调用 check
+        """
+        return {}
+
+    def applies_to(self, ctx: RuleContext) -> bool:
+        """
+        判断规则是否适用于当前文件
+
+        返回 False 时引擎跳过该规则，不注册其处理函数也不调用 check。
+        默认按 required_tokens 与 required_pattern 对源代码做一次文本筛选，
+        源代码为空时不筛选
+        """
+        source_code = ctx.source_code
+        if not source_code:
+            return True
+        tokens = self.required_tokens
+        if tokens and not any(token in source_code for token in tokens):
+            return False
+        pattern = self.required_pattern
+        return pattern is None or pattern.search(source_code) is not None
+
     def _get_source_line(self, source_code: str, line_number: int) -> str:
         """获取指定行的源代码"""
-        lines = source_code.split("\n")
-        if 1 <= line_number <= len(lines):
-            return lines[line_number - 1].strip()
+        offsets = line_offsets(source_code)
+        if 1 <= line_number < len(offsets):
+            return source_code[offsets[line_number - 1] : offsets[line_number] - 1].strip()
         return ""
 
     def _get_source_segment(self, source_code: str, node: ast.AST, context_lines: int = 0) -> str:
@@ -77,11 +533,13 @@ class BaseRule(ABC):
         if not hasattr(node, "lineno"):
             return ""
 
-        lines = source_code.split("\n")
+        offsets = line_offsets(source_code)
         start_line = max(1, node.lineno - context_lines)
-        end_line = min(len(lines), getattr(node, "end_lineno", node.lineno) + context_lines)
+        end_line = min(len(offsets) - 1, getattr(node, "end_lineno", node.lineno) + context_lines)
+        if start_line > end_line:
+            return ""
 
-        return "\n".join(lines[start_line - 1 : end_line]).strip()
+        return source_code[offsets[start_line - 1] : offsets[end_line] - 1].strip()
 
     def _create_vulnerability(
         self,
@@ -95,15 +553,61 @@ class BaseRule(ABC):
     ) -> Vulnerability:
         """
         创建漏洞对象的便捷方法
+
+        按 Vulnerability 的字段顺序传位置参数，省去关键字参数的匹配
         """
         return Vulnerability(
-            rule_id=self.rule_id,
-            rule_name=self.rule_name,
-            severity=severity or self.severity,
-            file_path=file_path,
-            line_number=line_number,
-            column=column,
-            code_snippet=code_snippet,
-            description=description,
-            suggestion=suggestion,
+            self.rule_id,
+            self.rule_name,
+            severity or self.severity,
+            file_path,
+            line_number,
+            column,
+            code_snippet,
+            description,
+            suggestion,
         )
+
+    def _node_vulnerability(
+        self,
+        ctx: RuleContext,
+        node: ast.AST,
+        description: str,
+        suggestion: str,
+        severity: str = None,
+    ) -> Vulnerability:
+        """
+        在节点处理函数中创建漏洞对象
+
+        文件路径与源代码取自 ctx，位置取自节点，代码片段为节点所在行
+        """
+        return Vulnerability(
+            self.rule_id,
+            self.rule_name,
+            severity or self.severity,
+            ctx.file_path,
+            node.lineno,
+            node.col_offset,
+            self._get_source_line(ctx.source_code, node.lineno),
+            description,
+            suggestion,
+        )
+
+
+class VisitorRule(BaseRule):
+    """
+    基于节点处理函数的规则基类
+
+    子类只需实现 visitors()；单独调用 check 时只运行本规则的处理函数
+    """
+
+    __slots__ = ()
+
+    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
+        ctx = RuleContext(ast_tree, file_path, source_code)
+        dispatcher = AstDispatcher()
+        dispatcher.add_rule(self)
+        dispatcher.run(ctx)
+        if self.rule_id in ctx.errors:
+            raise ctx.errors[self.rule_id]
+        return ctx.findings.get(self.rule_id, [])
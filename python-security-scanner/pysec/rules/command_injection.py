@@ -7,7 +7,7 @@
 import ast
 from typing import List
 
-from .base import BaseRule, register_rule
+from .base import BaseRule, iter_calls, register_rule
 from ..models import Vulnerability
 
 
@@ -102,40 +102,39 @@ class CommandInjectionRule(BaseRule):
     def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
         vulnerabilities = []
 
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Call):
-                func_name = self._get_func_name(node)
+        for node in iter_calls(ast_tree):
+            func_name = self._get_func_name(node)
 
-                # 检查是否为直接危险函数
-                if func_name in self.DANGEROUS_FUNCTIONS:
-                    info = self.DANGEROUS_FUNCTIONS[func_name]
+            # 检查是否为直接危险函数
+            if func_name in self.DANGEROUS_FUNCTIONS:
+                info = self.DANGEROUS_FUNCTIONS[func_name]
+                vulnerabilities.append(
+                    self._create_vulnerability(
+                        file_path=file_path,
+                        line_number=node.lineno,
+                        column=node.col_offset,
+                        code_snippet=self._get_source_line(source_code, node.lineno),
+                        description=f"调用危险函数 {func_name}(): {info['desc']}",
+                        suggestion="避免执行外部命令；如必须执行，使用参数列表形式并严格校验输入",
+                        severity=info["severity"],
+                    )
+                )
+
+            # 检查 subprocess 函数
+            elif func_name in self.SUBPROCESS_FUNCTIONS:
+                if self._has_shell_true(node):
                     vulnerabilities.append(
                         self._create_vulnerability(
                             file_path=file_path,
                             line_number=node.lineno,
                             column=node.col_offset,
                             code_snippet=self._get_source_line(source_code, node.lineno),
-                            description=f"调用危险函数 {func_name}(): {info['desc']}",
-                            suggestion="避免执行外部命令；如必须执行，使用参数列表形式并严格校验输入",
-                            severity=info["severity"],
+                            description=f"调用 {func_name}() 时使用 shell=True，存在命令注入风险",
+                            suggestion="避免使用 shell=True；使用参数列表传递命令；对用户输入进行严格校验",
+                            severity="critical",
                         )
                     )
 
-                # 检查 subprocess 函数
-                elif func_name in self.SUBPROCESS_FUNCTIONS:
-                    if self._has_shell_true(node):
-                        vulnerabilities.append(
-                            self._create_vulnerability(
-                                file_path=file_path,
-                                line_number=node.lineno,
-                                column=node.col_offset,
-                                code_snippet=self._get_source_line(source_code, node.lineno),
-                                description=f"调用 {func_name}() 时使用 shell=True，存在命令注入风险",
-                                suggestion="避免使用 shell=True；使用参数列表传递命令；对用户输入进行严格校验",
-                                severity="critical",
-                            )
-                        )
-
         return vulnerabilities
 
     def _get_func_name(self, node: ast.Call) -> str:
@@ -7,7 +7,7 @@
 import ast
 from typing import List, Dict
 
-from .base import BaseRule, register_rule
+from .base import BaseRule, iter_calls, register_rule
 from ..models import Vulnerability
 
 
@@ -121,39 +121,38 @@ class DangerousFunctionsRule(BaseRule):
     def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
         vulnerabilities = []
 
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Call):
-                func_name = self._get_func_name(node)
+        for node in iter_calls(ast_tree):
+            func_name = self._get_func_name(node)
 
-                # 检查危险内置函数
-                if func_name in self.DANGEROUS_BUILTINS:
-                    info = self.DANGEROUS_BUILTINS[func_name]
-                    vulnerabilities.append(
-                        self._create_vulnerability(
-                            file_path=file_path,
-                            line_number=node.lineno,
-                            column=node.col_offset,
-                            code_snippet=self._get_source_line(source_code, node.lineno),
-                            description=f"调用危险函数 {func_name}(): {info['desc']}",
-                            suggestion=info["fix"],
-                            severity=info["severity"],
-                        )
+            # 检查危险内置函数
+            if func_name in self.DANGEROUS_BUILTINS:
+                info = self.DANGEROUS_BUILTINS[func_name]
+                vulnerabilities.append(
+                    self._create_vulnerability(
+                        file_path=file_path,
+                        line_number=node.lineno,
+                        column=node.col_offset,
+                        code_snippet=self._get_source_line(source_code, node.lineno),
+                        description=f"调用危险函数 {func_name}(): {info['desc']}",
+                        suggestion=info["fix"],
+                        severity=info["severity"],
                     )
+                )
 
-                # 检查危险模块方法
-                elif func_name in self.DANGEROUS_METHODS:
-                    info = self.DANGEROUS_METHODS[func_name]
-                    vulnerabilities.append(
-                        self._create_vulnerability(
-                            file_path=file_path,
-                            line_number=node.lineno,
-                            column=node.col_offset,
-                            code_snippet=self._get_source_line(source_code, node.lineno),
-                            description=f"调用危险方法 {func_name}(): {info['desc']}",
-                            suggestion=info["fix"],
-                            severity=info["severity"],
-                        )
+            # 检查危险模块方法
+            elif func_name in self.DANGEROUS_METHODS:
+                info = self.DANGEROUS_METHODS[func_name]
+                vulnerabilities.append(
+                    self._create_vulnerability(
+                        file_path=file_path,
+                        line_number=node.lineno,
+                        column=node.col_offset,
+                        code_snippet=self._get_source_line(source_code, node.lineno),
+                        description=f"调用危险方法 {func_name}(): {info['desc']}",
+                        suggestion=info["fix"],
+                        severity=info["severity"],
                     )
+                )
 
         return vulnerabilities
 
@@ -5,257 +5,274 @@ Django 框架安全检测规则
 """
 
 import ast
+import functools
 import re
-from typing import List, Optional
+from typing import Optional, Tuple
 
-from .base import BaseRule, register_rule
-from ..models import Vulnerability
+from ._ast_fast import assigned_names, const_value
+from .base import RuleContext, VisitorRule, register_rule
+
+
+# 危险的 Django ORM 方法
+#
+# 名称比较使用 == / in 而不是 is：从 AST 缓存反序列化的节点中标识符未被驻留，is 比较会漏报
+_DANGEROUS_ORM = frozenset({
+    "raw",       # Model.objects.raw(sql)
+    "extra",     # QuerySet.extra(...)
+    "RawSQL",    # django.db.models.expressions.RawSQL
+})
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_settings_file(file_path: str) -> bool:
+    """判断是否为 Django 配置文件（settings.py 或路径中含 settings）"""
+    return file_path.endswith('settings.py') or 'settings' in file_path.lower()
 
 
 @register_rule
-class DjangoDebugRule(BaseRule):
+class DjangoDebugRule(VisitorRule):
     """Django DEBUG 模式检测"""
 
     rule_id = "DJG001"
     rule_name = "Django DEBUG 模式开启"
     severity = "high"
     description = "检测 DEBUG = True，生产环境不应启用调试模式"
+    required_tokens = ("DEBUG",)
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查 DEBUG = True"""
-        vulnerabilities = []
+    def visitors(self):
+        return {ast.Assign: self._visit_assign}
 
+    def applies_to(self, ctx: RuleContext) -> bool:
         # 只检查 settings.py 文件
-        if not file_path.endswith('settings.py') and 'settings' not in file_path.lower():
-            return vulnerabilities
-
-        for node in ast.walk(ast_tree):
-            # 检测 DEBUG = True
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and target.id == "DEBUG":
-                        # 检查值是否为 True
-                        if isinstance(node.value, ast.Constant) and node.value.value is True:
-                            vuln = self._create_vulnerability(
-                                file_path=file_path,
-                                line_number=node.lineno,
-                                column=node.col_offset,
-                                code_snippet=self._get_source_segment(source_code, node),
-                                description="检测到 DEBUG = True，生产环境启用调试模式会泄露敏感信息",
-                                suggestion="在生产环境设置 DEBUG = False；使用环境变量控制：DEBUG = os.getenv('DEBUG', 'False') == 'True'",
-                            )
-                            vulnerabilities.append(vuln)
+        return _is_settings_file(ctx.file_path) and super().applies_to(ctx)
 
-        return vulnerabilities
+    def _visit_assign(self, node: ast.Assign, ctx: RuleContext):
+        """检查 DEBUG = True"""
+        for name in assigned_names(node):
+            if name == "DEBUG":
+                # 检查值是否为 True
+                if const_value(node.value) is True:
+                    vuln = self._create_vulnerability(
+                        file_path=ctx.file_path,
+                        line_number=node.lineno,
+                        column=node.col_offset,
+                        code_snippet=self._get_source_segment(ctx.source_code, node),
+                        description="检测到 DEBUG = True，生产环境启用调试模式会泄露敏感信息",
+                        suggestion="在生产环境设置 DEBUG = False；使用环境变量控制：DEBUG = os.getenv('DEBUG', 'False') == 'True'",
+                    )
+                    ctx.add(vuln)
 
 
 @register_rule
-class DjangoSecretKeyRule(BaseRule):
+class DjangoSecretKeyRule(VisitorRule):
     """Django SECRET_KEY 硬编码检测"""
 
     rule_id = "DJG002"
     rule_name = "Django SECRET_KEY 硬编码"
     severity = "critical"
     description = "检测 SECRET_KEY 硬编码在代码中，密钥泄露会导致严重安全问题"
+    required_tokens = ("SECRET_KEY",)
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查 SECRET_KEY 硬编码"""
-        vulnerabilities = []
+    def visitors(self):
+        return {ast.Assign: self._visit_assign}
 
+    def applies_to(self, ctx: RuleContext) -> bool:
         # 只检查 settings.py 文件
-        if not file_path.endswith('settings.py') and 'settings' not in file_path.lower():
-            return vulnerabilities
-
-        for node in ast.walk(ast_tree):
-            # 检测 SECRET_KEY = "..."
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and target.id == "SECRET_KEY":
-                        # 检查是否为硬编码字符串
-                        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
-                            # 检查是否像是真实的密钥（长度 > 20）
-                            if len(node.value.value) > 20:
-                                vuln = self._create_vulnerability(
-                                    file_path=file_path,
-                                    line_number=node.lineno,
-                                    column=node.col_offset,
-                                    code_snippet=self._get_source_segment(source_code, node),
-                                    description="检测到 SECRET_KEY 硬编码在代码中，密钥泄露会导致会话伪造、CSRF 绕过等严重问题",
-                                    suggestion="使用环境变量存储密钥：SECRET_KEY = os.environ.get('SECRET_KEY')；或使用 python-decouple、django-environ 等库管理配置",
-                                )
-                                vulnerabilities.append(vuln)
-
-        return vulnerabilities
+        return _is_settings_file(ctx.file_path) and super().applies_to(ctx)
+
+    def _visit_assign(self, node: ast.Assign, ctx: RuleContext):
+        """检查 SECRET_KEY 硬编码"""
+        for name in assigned_names(node):
+            if name == "SECRET_KEY":
+                # 检查是否为硬编码字符串，且像是真实的密钥（长度 > 20）
+                value = const_value(node.value)
+                if isinstance(value, str) and len(value) > 20:
+                    vuln = self._create_vulnerability(
+                        file_path=ctx.file_path,
+                        line_number=node.lineno,
+                        column=node.col_offset,
+                        code_snippet=self._get_source_segment(ctx.source_code, node),
+                        description="检测到 SECRET_KEY 硬编码在代码中，密钥泄露会导致会话伪造、CSRF 绕过等严重问题",
+                        suggestion="使用环境变量存储密钥：SECRET_KEY = os.environ.get('SECRET_KEY')；或使用 python-decouple、django-environ 等库管理配置",
+                    )
+                    ctx.add(vuln)
 
 
 @register_rule
-class DjangoAllowedHostsRule(BaseRule):
+class DjangoAllowedHostsRule(VisitorRule):
     """Django ALLOWED_HOSTS 配置检测"""
 
     rule_id = "DJG003"
     rule_name = "Django ALLOWED_HOSTS 配置不当"
     severity = "high"
     description = "检测 ALLOWED_HOSTS = ['*']，允许所有主机访问存在安全风险"
+    required_tokens = ("ALLOWED_HOSTS",)
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查 ALLOWED_HOSTS 配置"""
-        vulnerabilities = []
+    def visitors(self):
+        return {ast.Assign: self._visit_assign}
 
+    def applies_to(self, ctx: RuleContext) -> bool:
         # 只检查 settings.py 文件
-        if not file_path.endswith('settings.py') and 'settings' not in file_path.lower():
-            return vulnerabilities
-
-        for node in ast.walk(ast_tree):
-            # 检测 ALLOWED_HOSTS = [...]
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and target.id == "ALLOWED_HOSTS":
-                        # 检查是否包含 '*'
-                        if isinstance(node.value, ast.List):
-                            for elt in node.value.elts:
-                                if isinstance(elt, ast.Constant) and elt.value == '*':
-                                    vuln = self._create_vulnerability(
-                                        file_path=file_path,
-                                        line_number=node.lineno,
-                                        column=node.col_offset,
-                                        code_snippet=self._get_source_segment(source_code, node),
-                                        description="检测到 ALLOWED_HOSTS = ['*']，允许任意主机名访问，可能遭受 Host Header 攻击",
-                                        suggestion="明确指定允许的主机名：ALLOWED_HOSTS = ['example.com', 'www.example.com']；或使用环境变量配置",
-                                    )
-                                    vulnerabilities.append(vuln)
-                                    break  # 只报告一次
-
-        return vulnerabilities
+        return _is_settings_file(ctx.file_path) and super().applies_to(ctx)
+
+    def _visit_assign(self, node: ast.Assign, ctx: RuleContext):
+        """检查 ALLOWED_HOSTS 配置"""
+        for name in assigned_names(node):
+            if name == "ALLOWED_HOSTS":
+                # 检查是否包含 '*'
+                if isinstance(node.value, ast.List):
+                    for elt in node.value.elts:
+                        if const_value(elt) == '*':
+                            vuln = self._create_vulnerability(
+                                file_path=ctx.file_path,
+                                line_number=node.lineno,
+                                column=node.col_offset,
+                                code_snippet=self._get_source_segment(ctx.source_code, node),
+                                description="检测到 ALLOWED_HOSTS = ['*']，允许任意主机名访问，可能遭受 Host Header 攻击",
+                                suggestion="明确指定允许的主机名：ALLOWED_HOSTS = ['example.com', 'www.example.com']；或使用环境变量配置",
+                            )
+                            ctx.add(vuln)
+                            break  # 只报告一次
 
 
 @register_rule
-class DjangoCSRFRule(BaseRule):
+class DjangoCSRFRule(VisitorRule):
     """Django CSRF 保护检测"""
 
     rule_id = "DJG004"
     rule_name = "Django CSRF 保护禁用"
     severity = "high"
     description = "检测 CSRF 保护被禁用或绕过"
-
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查 CSRF 保护"""
-        vulnerabilities = []
-
-        for node in ast.walk(ast_tree):
-            # 检测 @csrf_exempt 装饰器
-            if isinstance(node, ast.FunctionDef):
-                for decorator in node.decorator_list:
-                    decorator_name = None
-                    
-                    if isinstance(decorator, ast.Name):
-                        decorator_name = decorator.id
-                    elif isinstance(decorator, ast.Attribute):
-                        decorator_name = decorator.attr
-                    
-                    if decorator_name == "csrf_exempt":
-                        vuln = self._create_vulnerability(
-                            file_path=file_path,
-                            line_number=node.lineno,
-                            column=node.col_offset,
-                            code_snippet=self._get_source_segment(source_code, node),
-                            description=f"视图函数 '{node.name}' 使用 @csrf_exempt 装饰器，禁用了 CSRF 保护",
-                            suggestion="避免使用 @csrf_exempt；如必须禁用，确保实现其他安全机制（如自定义 token 验证）",
-                        )
-                        vulnerabilities.append(vuln)
-
-            # 检测 MIDDLEWARE 中移除 CsrfViewMiddleware
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and target.id == "MIDDLEWARE":
-                        # 检查是否为列表
-                        if isinstance(node.value, ast.List):
-                            has_csrf = False
-                            for elt in node.value.elts:
-                                if isinstance(elt, ast.Constant) and isinstance(elt.value, str):
-                                    if 'CsrfViewMiddleware' in elt.value:
-                                        has_csrf = True
-                                        break
-                            
-                            # 如果没有找到 CSRF 中间件（且列表不为空）
-                            if not has_csrf and len(node.value.elts) > 0:
-                                # 只在 settings.py 中报告
-                                if file_path.endswith('settings.py') or 'settings' in file_path.lower():
-                                    vuln = self._create_vulnerability(
-                                        file_path=file_path,
-                                        line_number=node.lineno,
-                                        column=node.col_offset,
-                                        code_snippet=self._get_source_segment(source_code, node),
-                                        description="MIDDLEWARE 配置中未找到 CsrfViewMiddleware，CSRF 保护可能被禁用",
-                                        suggestion="确保在 MIDDLEWARE 中包含 'django.middleware.csrf.CsrfViewMiddleware'",
-                                    )
-                                    vulnerabilities.append(vuln)
-
-        return vulnerabilities
+    required_tokens = ("csrf_exempt", "MIDDLEWARE")
+
+    def visitors(self):
+        return {
+            ast.FunctionDef: self._visit_function,
+            ast.Assign: self._visit_assign,
+        }
+
+    def _visit_function(self, node: ast.FunctionDef, ctx: RuleContext):
+        """检测 @csrf_exempt 装饰器"""
+        for decorator in node.decorator_list:
+            decorator_name = None
+
+            if isinstance(decorator, ast.Name):
+                decorator_name = decorator.id
+            elif isinstance(decorator, ast.Attribute):
+                decorator_name = decorator.attr
+
+            if decorator_name == "csrf_exempt":
+                vuln = self._create_vulnerability(
+                    file_path=ctx.file_path,
+                    line_number=node.lineno,
+                    column=node.col_offset,
+                    code_snippet=self._get_source_segment(ctx.source_code, node),
+                    description=f"视图函数 '{node.name}' 使用 @csrf_exempt 装饰器，禁用了 CSRF 保护",
+                    suggestion="避免使用 @csrf_exempt；如必须禁用，确保实现其他安全机制（如自定义 token 验证）",
+                )
+                ctx.add(vuln)
+
+    def _visit_assign(self, node: ast.Assign, ctx: RuleContext):
+        """检测 MIDDLEWARE 中移除 CsrfViewMiddleware"""
+        file_path = ctx.file_path
+        for name in assigned_names(node):
+            if name == "MIDDLEWARE":
+                # 检查是否为列表
+                if isinstance(node.value, ast.List):
+                    has_csrf = False
+                    for elt in node.value.elts:
+                        value = const_value(elt)
+                        if isinstance(value, str) and 'CsrfViewMiddleware' in value:
+                            has_csrf = True
+                            break
+
+                    # 如果没有找到 CSRF 中间件（且列表不为空）
+                    if not has_csrf and len(node.value.elts) > 0:
+                        # 只在 settings.py 中报告
+                        if _is_settings_file(file_path):
+                            vuln = self._create_vulnerability(
+                                file_path=file_path,
+                                line_number=node.lineno,
+                                column=node.col_offset,
+                                code_snippet=self._get_source_segment(ctx.source_code, node),
+                                description="MIDDLEWARE 配置中未找到 CsrfViewMiddleware，CSRF 保护可能被禁用",
+                                suggestion="确保在 MIDDLEWARE 中包含 'django.middleware.csrf.CsrfViewMiddleware'",
+                            )
+                            ctx.add(vuln)
 
 
 @register_rule
-class DjangoRawSQLRule(BaseRule):
+class DjangoRawSQLRule(VisitorRule):
     """Django 原始 SQL 查询检测"""
 
     rule_id = "DJG005"
     rule_name = "Django 不安全的原始 SQL 查询"
     severity = "high"
     description = "检测使用 raw()、extra()、RawSQL() 等原始 SQL 查询，可能存在 SQL 注入风险"
+    required_tokens = ("raw", "extra", "RawSQL")
 
     # 危险的 Django ORM 方法
-    DANGEROUS_ORM_METHODS = {
-        "raw",       # Model.objects.raw(sql)
-        "extra",     # QuerySet.extra(...)
-        "RawSQL",    # django.db.models.expressions.RawSQL
-    }
+    DANGEROUS_ORM_METHODS = _DANGEROUS_ORM
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查原始 SQL 查询"""
-        vulnerabilities = []
-
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Call):
-                # 检测 Model.objects.raw() 或 queryset.raw()
-                if isinstance(node.func, ast.Attribute):
-                    if node.func.attr in self.DANGEROUS_ORM_METHODS:
-                        # 检查 SQL 参数是否包含字符串拼接
-                        is_dangerous = False
-                        description = ""
-                        
-                        if node.args:
-                            sql_arg = node.args[0]
-                            
-                            # 检查是否使用字符串格式化
-                            if isinstance(sql_arg, (ast.BinOp, ast.JoinedStr)):
-                                is_dangerous = True
-                                description = f"调用 {node.func.attr}() 时使用字符串拼接构造 SQL，存在 SQL 注入风险"
-                            
-                            # 检查是否使用 .format()
-                            elif isinstance(sql_arg, ast.Call):
-                                if isinstance(sql_arg.func, ast.Attribute) and sql_arg.func.attr == "format":
-                                    is_dangerous = True
-                                    description = f"调用 {node.func.attr}() 时使用 .format() 构造 SQL，存在 SQL 注入风险"
-                            
-                            # 检查是否直接使用变量（可能不安全）
-                            elif isinstance(sql_arg, ast.Name):
-                                # 警告级别：使用变量可能不安全
-                                is_dangerous = True
-                                description = f"调用 {node.func.attr}() 使用原始 SQL 查询，确保使用参数化查询防止 SQL 注入"
-                        
-                        # 即使没有参数，使用 raw/extra 也需要警告
-                        if not is_dangerous and node.func.attr in ["raw", "extra", "RawSQL"]:
-                            is_dangerous = True
-                            description = f"使用 {node.func.attr}() 执行原始 SQL 查询，可能存在安全风险"
-                        
-                        if is_dangerous:
-                            vuln = self._create_vulnerability(
-                                file_path=file_path,
-                                line_number=node.lineno,
-                                column=node.col_offset,
-                                code_snippet=self._get_source_segment(source_code, node),
-                                description=description,
-                                suggestion="使用 Django ORM 的查询方法避免原始 SQL；如必须使用，确保使用参数化查询：raw('SELECT * FROM table WHERE id = %s', [user_id])",
-                            )
-                            vulnerabilities.append(vuln)
+    def visitors(self):
+        return {ast.Call: self._visit_call}
 
-        return vulnerabilities
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        """检查原始 SQL 查询"""
+        match = _dangerous_call_match(node)
+        if match is None:
+            return
+
+        vuln = self._create_vulnerability(
+            file_path=ctx.file_path,
+            line_number=node.lineno,
+            column=node.col_offset,
+            code_snippet=self._get_source_segment(ctx.source_code, node),
+            description=match[1],
+            suggestion="使用 Django ORM 的查询方法避免原始 SQL；如必须使用，确保使用参数化查询：raw('SELECT * FROM table WHERE id = %s', [user_id])",
+        )
+        ctx.add(vuln)
+
+
+def _dangerous_call_match(node: ast.Call) -> Optional[Tuple[str, str]]:
+    """
+    匹配 raw()/extra()/RawSQL() 等原始 SQL 调用
+
+    每个 ast.Call 都会经过这里，先用一次属性名查表排除绝大多数调用，
+    其余判断使用 type(x) is C 精确比较
+
+    Args:
+        node: 调用节点
+
+    Returns:
+        (方法名, 问题描述)，不匹配时返回 None
+    """
+    # 检测 Model.objects.raw() 或 queryset.raw()
+    func = node.func
+    if type(func) is not ast.Attribute:
+        return None
+    method = func.attr
+    if method not in _DANGEROUS_ORM:
+        return None
+
+    # 检查 SQL 参数是否包含字符串拼接
+    if node.args:
+        sql_arg = node.args[0]
+        arg_type = type(sql_arg)
+
+        # 检查是否使用字符串格式化
+        if arg_type is ast.BinOp or arg_type is ast.JoinedStr:
+            return method, f"调用 {method}() 时使用字符串拼接构造 SQL，存在 SQL 注入风险"
+
+        # 检查是否使用 .format()
+        if arg_type is ast.Call:
+            if type(sql_arg.func) is ast.Attribute and sql_arg.func.attr == "format":
+                return method, f"调用 {method}() 时使用 .format() 构造 SQL，存在 SQL 注入风险"
+
+        # 检查是否直接使用变量（可能不安全）
+        elif arg_type is ast.Name:
+            # 警告级别：使用变量可能不安全
+            return method, f"调用 {method}() 使用原始 SQL 查询，确保使用参数化查询防止 SQL 注入"
+
+    # 即使没有参数，使用 raw/extra 也需要警告
+    return method, f"使用 {method}() 执行原始 SQL 查询，可能存在安全风险"
@@ -6,16 +6,18 @@
 
 import ast
 import re
-from typing import List
 
-from .base import BaseRule, register_rule
+from ._ast_fast import assigned_names, str_const
+from .base import RuleContext, VisitorRule, register_rule
 from ..models import Vulnerability
 
 
 @register_rule
-class HardcodedSecretsRule(BaseRule):
+class HardcodedSecretsRule(VisitorRule):
     """硬编码敏感信息检测规则"""
 
+    __slots__ = ()
+
     rule_id = "SEC001"
     rule_name = "硬编码敏感信息"
     severity = "high"
@@ -46,9 +48,13 @@ class HardcodedSecretsRule(BaseRule):
         r"postgres_?password",
         r"redis_?password",
     ]
+    # 合并为一个模式，一次匹配完成判断
+    _SENSITIVE_RE = re.compile("|".join(SENSITIVE_PATTERNS))
+    # 变量名按小写匹配，因此源代码中必然以某种大小写形式出现上述模式
+    required_pattern = re.compile("|".join(SENSITIVE_PATTERNS), re.IGNORECASE)
 
     # 排除的占位符值（这些值不应被视为硬编码）
-    PLACEHOLDER_VALUES = [
+    PLACEHOLDER_VALUES = frozenset({
         "",
         "xxx",
         "xxxx",
@@ -82,95 +88,78 @@ class HardcodedSecretsRule(BaseRule):
         "env",
         "os.environ",
         "os.getenv",
-    ]
+    })
 
     # 看起来像真实密钥的最小长度
     MIN_SECRET_LENGTH = 6
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        vulnerabilities = []
-
-        for node in ast.walk(ast_tree):
-            # 检查变量赋值: password = "secret123"
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        var_name = target.id
-                        if self._is_sensitive_name(var_name):
-                            if self._is_hardcoded_secret(node.value):
-                                vulnerabilities.append(
-                                    self._create_secret_vuln(file_path, node, source_code, var_name)
-                                )
-
-            # 检查类型注解赋值: password: str = "secret123"
-            elif isinstance(node, ast.AnnAssign):
-                if isinstance(node.target, ast.Name):
-                    var_name = node.target.id
-                    if self._is_sensitive_name(var_name):
-                        if node.value and self._is_hardcoded_secret(node.value):
-                            vulnerabilities.append(
-                                self._create_secret_vuln(file_path, node, source_code, var_name)
-                            )
-
-            # 检查字典中的敏感键: {"password": "secret123"}
-            elif isinstance(node, ast.Dict):
-                for key, value in zip(node.keys, node.values):
-                    if (
-                        key is not None
-                        and isinstance(key, ast.Constant)
-                        and isinstance(key.value, str)
-                    ):
-                        if self._is_sensitive_name(key.value):
-                            if self._is_hardcoded_secret(value):
-                                vulnerabilities.append(
-                                    self._create_secret_vuln(
-                                        file_path, node, source_code, key.value
-                                    )
-                                )
-
-            # 检查函数调用中的关键字参数: connect(password="secret123")
-            elif isinstance(node, ast.Call):
-                for keyword in node.keywords:
-                    if keyword.arg and self._is_sensitive_name(keyword.arg):
-                        if self._is_hardcoded_secret(keyword.value):
-                            vulnerabilities.append(
-                                self._create_secret_vuln(file_path, node, source_code, keyword.arg)
-                            )
-
-        return vulnerabilities
+    def visitors(self):
+        return {
+            ast.Assign: self._visit_assign,
+            ast.AnnAssign: self._visit_annassign,
+            ast.Dict: self._visit_dict,
+            ast.Call: self._visit_call,
+        }
+
+    def _visit_assign(self, node: ast.Assign, ctx: RuleContext):
+        """检查变量赋值: password = 'secret123'"""
+        for var_name in assigned_names(node):
+            if self._is_sensitive_name(var_name):
+                if self._is_hardcoded_secret(node.value):
+                    ctx.add(self._create_secret_vuln(ctx.file_path, node, ctx.source_code, var_name))
+
+    def _visit_annassign(self, node: ast.AnnAssign, ctx: RuleContext):
+        """检查类型注解赋值: password: str = 'secret123'"""
+        if type(node.target) is ast.Name:
+            var_name = node.target.id
+            if self._is_sensitive_name(var_name):
+                if node.value and self._is_hardcoded_secret(node.value):
+                    ctx.add(self._create_secret_vuln(ctx.file_path, node, ctx.source_code, var_name))
+
+    def _visit_dict(self, node: ast.Dict, ctx: RuleContext):
+        """检查字典中的敏感键: {"password": "secret123"}"""
+        for key, value in zip(node.keys, node.values):
+            key_name = str_const(key)
+            if key_name is not None and self._is_sensitive_name(key_name):
+                if self._is_hardcoded_secret(value):
+                    ctx.add(self._create_secret_vuln(ctx.file_path, node, ctx.source_code, key_name))
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        """检查函数调用中的关键字参数: connect(password="secret123")"""
+        for keyword in node.keywords:
+            if keyword.arg and self._is_sensitive_name(keyword.arg):
+                if self._is_hardcoded_secret(keyword.value):
+                    ctx.add(self._create_secret_vuln(ctx.file_path, node, ctx.source_code, keyword.arg))
 
     def _is_sensitive_name(self, name: str) -> bool:
         """检查变量名是否为敏感名称"""
-        name_lower = name.lower()
-        return any(re.search(pattern, name_lower) for pattern in self.SENSITIVE_PATTERNS)
+        return self._SENSITIVE_RE.search(name.lower()) is not None
 
     def _is_hardcoded_secret(self, node) -> bool:
         """检查值是否为硬编码的敏感信息"""
-        if isinstance(node, ast.Constant) and isinstance(node.value, str):
-            value = node.value
-            value_lower = value.lower().strip()
-
-            # 排除占位符
-            if value_lower in self.PLACEHOLDER_VALUES:
-                return False
+        value = str_const(node)
+        if value is None:
+            return False
 
-            # 排除过短的值
-            if len(value) < self.MIN_SECRET_LENGTH:
-                return False
+        # 排除过短的值（先于占位符判断，多数短值无需转小写）
+        if len(value) < self.MIN_SECRET_LENGTH:
+            return False
 
-            # 排除看起来像环境变量引用的值
-            if value.startswith("${") or value.startswith("$"):
-                return False
+        # 排除占位符
+        if value.lower().strip() in self.PLACEHOLDER_VALUES:
+            return False
 
-            # 排除看起来像配置占位符的值
-            if value.startswith("{") and value.endswith("}"):
-                return False
-            if value.startswith("<") and value.endswith(">"):
-                return False
+        # 排除看起来像环境变量引用的值（含 ${...}）
+        if value.startswith("$"):
+            return False
 
-            return True
+        # 排除看起来像配置占位符的值
+        if value.startswith("{") and value.endswith("}"):
+            return False
+        if value.startswith("<") and value.endswith(">"):
+            return False
 
-        return False
+        return True
 
     def _create_secret_vuln(
         self, file_path: str, node: ast.AST, source_code: str, var_name: str
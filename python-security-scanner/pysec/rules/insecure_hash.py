@@ -5,20 +5,26 @@
 """
 
 import ast
-from typing import List, Set, Optional
+import re
+from typing import Dict, List, Set, Optional
 
-from .base import BaseRule, register_rule
+from ._ast_fast import str_const
+from .base import RuleContext, VisitorRule, keyword_regex, register_rule
 from ..models import Vulnerability
 
 
 @register_rule
-class InsecureHashRule(BaseRule):
+class InsecureHashRule(VisitorRule):
     """不安全的哈希算法检测规则"""
 
+    __slots__ = ()
+
     rule_id = "HSH001"
     rule_name = "不安全的哈希算法"
     severity = "medium"
     description = "检测使用MD5、SHA1等弱哈希算法用于密码或安全场景"
+    # 弱哈希调用都要求导入 hashlib；明文比较要求所在行含密码变量（忽略大小写）
+    required_pattern = re.compile("hashlib|password|passwd|pwd", re.IGNORECASE)
 
     # 弱哈希算法（不应用于密码或安全场景）
     WEAK_HASH_ALGORITHMS = {
@@ -53,46 +59,49 @@ class InsecureHashRule(BaseRule):
         "compare", "diff", "test", "mock", "example", "demo",
     }
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查不安全的哈希算法使用"""
-        vulnerabilities = []
-        source_lines = source_code.splitlines()
-
-        # 收集导入信息
-        imports = self._collect_imports(ast_tree)
-
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Call):
-                vuln = self._check_hash_call(node, imports, source_lines, file_path)
-                if vuln:
-                    vulnerabilities.append(vuln)
-            elif isinstance(node, ast.Compare):
-                vuln = self._check_plaintext_compare(node, source_lines, file_path)
-                if vuln:
-                    vulnerabilities.append(vuln)
-
-        return vulnerabilities
-
-    def _collect_imports(self, ast_tree: ast.AST) -> dict:
-        """收集import信息"""
-        imports = {"names": {}, "from_imports": set()}
-
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    name = alias.asname if alias.asname else alias.name
-                    imports["names"][name] = alias.name
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module or ""
-                for alias in node.names:
-                    name = alias.asname if alias.asname else alias.name
-                    imports["from_imports"].add((module, alias.name, name))
-                    imports["names"][name] = f"{module}.{alias.name}"
-
-        return imports
+    # 上述关键词集合编译为正则，一次扫描完成匹配；密码与安全上下文合并为一个
+    _CONTEXT_RE = keyword_regex(PASSWORD_CONTEXT_KEYWORDS | SECURITY_CONTEXT_KEYWORDS)
+    _NON_SECURITY_RE = keyword_regex(NON_SECURITY_CONTEXTS)
+    # 即使处于非安全上下文也应报告的密码关键词
+    _PASSWORD_WORD_RE = keyword_regex({"password", "passwd", "pwd", "credential"})
+
+    # 明文密码比较检测（均按小写行匹配）：密码变量、哈希比较、输入验证、用户输入来源
+    _COMPARE_PASSWORD_RE = keyword_regex({"password", "passwd", "pwd"})
+    _COMPARE_HASH_RE = keyword_regex({"hash", "hashed", "digest", "bcrypt", "argon", "scrypt", "pbkdf"})
+    _COMPARE_VALIDATION_RE = keyword_regex(
+        {"is not none", "is none", "!= none", "!= ''", '!= ""', "len("}
+    )
+    _COMPARE_INPUT_RE = keyword_regex({"input", "request", "form"})
+
+    def visitors(self):
+        return {
+            ast.Call: self._visit_call,
+            ast.Compare: self._visit_compare,
+        }
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        # 导入信息与源代码行按文件计算一次，各规则共用
+        imports = ctx.imports
+        source_lines = ctx.source_lines
+        lower_lines = ctx.lower_lines
+        context_cache = ctx.cached("HSH001.security_context", dict)
+        vuln = self._check_hash_call(
+            node, imports, source_lines, lower_lines, ctx.file_path, context_cache
+        )
+        if vuln:
+            ctx.add(vuln)
+
+    def _visit_compare(self, node: ast.Compare, ctx: RuleContext):
+        source_lines = ctx.source_lines
+        lower_lines = ctx.lower_lines
+        vuln = self._check_plaintext_compare(node, source_lines, lower_lines, ctx.file_path)
+        if vuln:
+            ctx.add(vuln)
 
     def _check_hash_call(self, node: ast.Call, imports: dict, 
-                         source_lines: List[str], file_path: str) -> Optional[Vulnerability]:
+                         source_lines: List[str], lower_lines: List[str],
+                         file_path: str,
+                         context_cache: Optional[Dict[int, bool]] = None) -> Optional[Vulnerability]:
         """检查哈希函数调用"""
         # 获取函数调用信息
         call_info = self._get_call_info(node, imports)
@@ -106,7 +115,7 @@ class InsecureHashRule(BaseRule):
             return None
 
         # 检查是否在安全上下文中使用
-        if not self._is_security_context(node, source_lines):
+        if not self._is_security_context(node, lower_lines, context_cache):
             return None
 
         # 获取代码片段
@@ -129,8 +138,8 @@ class InsecureHashRule(BaseRule):
     def _get_call_info(self, node: ast.Call, imports: dict) -> Optional[tuple]:
         """获取函数调用信息 (module, method, algorithm)"""
         # hashlib.md5() 或 hashlib.sha1() 形式
-        if isinstance(node.func, ast.Attribute):
-            if isinstance(node.func.value, ast.Name):
+        if type(node.func) is ast.Attribute:
+            if type(node.func.value) is ast.Name:
                 module_name = node.func.value.id
                 method_name = node.func.attr
                 
@@ -140,95 +149,94 @@ class InsecureHashRule(BaseRule):
                     if method_name in self.WEAK_HASHLIB_METHODS:
                         # hashlib.new('md5', ...) 形式
                         if method_name == "new" and node.args:
-                            if isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
-                                algo = node.args[0].value.lower()
+                            algo = str_const(node.args[0])
+                            if algo is not None:
+                                algo = algo.lower()
                                 if algo in self.WEAK_HASH_ALGORITHMS:
                                     return ("hashlib", "new", algo)
                         else:
                             return ("hashlib", method_name, method_name)
 
         # 直接导入的函数调用 from hashlib import md5
-        elif isinstance(node.func, ast.Name):
-            func_name = node.func.id
-            for module, orig_name, alias in imports.get("from_imports", set()):
-                if alias == func_name and module == "hashlib":
-                    if orig_name.lower() in self.WEAK_HASH_ALGORITHMS:
-                        return ("hashlib", orig_name, orig_name)
+        elif type(node.func) is ast.Name:
+            origin = imports["from_aliases"].get(node.func.id)
+            if origin is not None and origin[0] == "hashlib":
+                orig_name = origin[1]
+                if orig_name.lower() in self.WEAK_HASH_ALGORITHMS:
+                    return ("hashlib", orig_name, orig_name)
 
         return None
 
-    def _is_security_context(self, node: ast.Call, source_lines: List[str]) -> bool:
-        """判断是否在安全上下文中使用"""
+    def _is_security_context(self, node: ast.Call, lower_lines: List[str],
+                             cache: Optional[Dict[int, bool]] = None) -> bool:
+        """
+        判断是否在安全上下文中使用
+
+        结果只取决于调用所在行；传入 cache 时按行号记录结果，
+        同一行的多个调用只扫描一次上下文
+
+        Args:
+            node: 调用节点
+            lower_lines: 按文件预先转为小写的源代码行
+            cache: 行号 -> 判断结果
+        """
         line_idx = node.lineno - 1
-        if line_idx < 0 or line_idx >= len(source_lines):
+        if cache is None:
+            return self._line_in_security_context(line_idx, lower_lines)
+        result = cache.get(line_idx)
+        if result is None:
+            result = cache[line_idx] = self._line_in_security_context(line_idx, lower_lines)
+        return result
+
+    def _line_in_security_context(self, line_idx: int, lower_lines: List[str]) -> bool:
+        """判断第 line_idx 行（从 0 开始）附近是否为安全上下文"""
+        if line_idx < 0 or line_idx >= len(lower_lines):
             return False
 
         # 获取上下文
-        context_lines = []
-        for i in range(max(0, line_idx - 3), min(len(source_lines), line_idx + 3)):
-            context_lines.append(source_lines[i].lower())
-        context_text = " ".join(context_lines)
+        context_text = " ".join(lower_lines[max(0, line_idx - 3):line_idx + 3])
 
-        # 检查是否有非安全上下文关键词（降低误报）
-        for keyword in self.NON_SECURITY_CONTEXTS:
-            if keyword in context_text:
-                # 但如果同时有密码关键词，仍然报告
-                has_password_keyword = any(
-                    pwd_kw in context_text 
-                    for pwd_kw in ["password", "passwd", "pwd", "credential"]
-                )
-                if not has_password_keyword:
-                    return False
-
-        # 检查密码上下文
-        for keyword in self.PASSWORD_CONTEXT_KEYWORDS:
-            if keyword in context_text:
-                return True
+        # 有密码关键词时无论是否处于非安全上下文都报告（密码关键词本身也属于密码上下文）
+        if self._PASSWORD_WORD_RE.search(context_text):
+            return True
 
-        # 检查安全上下文
-        for keyword in self.SECURITY_CONTEXT_KEYWORDS:
-            if keyword in context_text:
-                return True
+        # 检查是否有非安全上下文关键词（降低误报）
+        if self._NON_SECURITY_RE.search(context_text):
+            return False
 
-        return False
+        # 检查密码上下文与安全上下文
+        return self._CONTEXT_RE.search(context_text) is not None
 
-    def _check_plaintext_compare(self, node: ast.Compare, source_lines: List[str], 
-                                  file_path: str) -> Optional[Vulnerability]:
+    def _check_plaintext_compare(self, node: ast.Compare, source_lines: List[str],
+                                  lower_lines: List[str], file_path: str) -> Optional[Vulnerability]:
         """检测明文密码比较"""
         # 检查是否是 == 或 != 比较
-        if not any(isinstance(op, (ast.Eq, ast.NotEq)) for op in node.ops):
+        if not any(type(op) is ast.Eq or type(op) is ast.NotEq for op in node.ops):
             return None
 
         line_idx = node.lineno - 1
         if line_idx < 0 or line_idx >= len(source_lines):
             return None
 
-        current_line = source_lines[line_idx].lower()
-
-        # 检查是否涉及密码变量的直接比较
-        password_patterns = ["password", "passwd", "pwd"]
-        has_password_var = any(pattern in current_line for pattern in password_patterns)
+        current_line = lower_lines[line_idx]
 
-        # 检查是否是字符串比较（可能是明文密码比较）
-        if not has_password_var:
+        # 检查是否涉及密码变量的直接比较（可能是明文密码比较）
+        if not self._COMPARE_PASSWORD_RE.search(current_line):
             return None
 
         # 排除哈希比较（password_hash == stored_hash 是安全的）
-        hash_indicators = ["hash", "hashed", "digest", "bcrypt", "argon", "scrypt", "pbkdf"]
-        if any(indicator in current_line for indicator in hash_indicators):
+        if self._COMPARE_HASH_RE.search(current_line):
             return None
 
         # 检查是否是输入验证而非密码验证
-        validation_indicators = ["is not none", "is none", "!= none", "!= ''", "!= \"\"", "len("]
-        if any(indicator in current_line for indicator in validation_indicators):
+        if self._COMPARE_VALIDATION_RE.search(current_line):
             return None
 
-        code_snippet = self._get_code_snippet(source_lines, node.lineno)
-
         # 只有当看起来像是在比较两个密码值时才报告
-        if "==" in current_line and has_password_var:
+        if "==" in current_line:
             # 进一步检查：是否像是 password == user_password 这样的比较
-            if "input" in current_line or "request" in current_line or "form" in current_line:
+            if self._COMPARE_INPUT_RE.search(current_line):
+                code_snippet = self._get_code_snippet(source_lines, node.lineno)
                 return self._create_vulnerability(
                     file_path=file_path,
                     line_number=node.lineno,
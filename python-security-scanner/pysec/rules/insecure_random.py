@@ -5,27 +5,35 @@
 """
 
 import ast
-from typing import List, Set
+from typing import Dict, List, Optional, Set
 
-from .base import BaseRule, register_rule
+from .base import RuleContext, VisitorRule, keyword_regex, register_rule
 from ..models import Vulnerability
 
 
 @register_rule
-class InsecureRandomRule(BaseRule):
+class InsecureRandomRule(VisitorRule):
     """不安全的随机数生成检测规则"""
 
+    __slots__ = ()
+
     rule_id = "RND001"
     rule_name = "不安全的随机数生成"
     severity = "medium"
     description = "检测使用random模块生成安全相关随机数的情况，应使用secrets模块"
+    # random 与 numpy.random 的调用都要求源代码中出现 random
+    required_tokens = ("random",)
 
     # random模块中不安全的函数
     UNSAFE_RANDOM_FUNCTIONS = {
-        "random": ["random", "randint", "randrange", "choice", "choices", 
-                   "sample", "shuffle", "getrandbits", "uniform"],
-        "numpy.random": ["rand", "randn", "randint", "random", "choice"],
+        "random": frozenset({"random", "randint", "randrange", "choice", "choices", 
+                             "sample", "shuffle", "getrandbits", "uniform"}),
+        "numpy.random": frozenset({"rand", "randn", "randint", "random", "choice"}),
     }
+    # 展开为 (模块, 函数名) 集合，一次查找完成判断
+    _UNSAFE_CALLS = frozenset(
+        (module, func) for module, funcs in UNSAFE_RANDOM_FUNCTIONS.items() for func in funcs
+    )
 
     # 安全上下文关键词（变量名或字符串中包含这些词表示可能用于安全目的）
     SECURITY_CONTEXT_KEYWORDS = {
@@ -43,42 +51,39 @@ class InsecureRandomRule(BaseRule):
         "index", "offset", "delay", "sleep", "jitter",
     }
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查不安全的随机数生成"""
-        vulnerabilities = []
-        source_lines = source_code.splitlines()
-
-        # 收集导入信息
-        imports = self._collect_imports(ast_tree)
-
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Call):
-                vuln = self._check_random_call(node, imports, source_lines, file_path)
-                if vuln:
-                    vulnerabilities.append(vuln)
-
-        return vulnerabilities
-
-    def _collect_imports(self, ast_tree: ast.AST) -> dict:
-        """收集import信息"""
-        imports = {"names": {}, "from_imports": set()}
-
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    name = alias.asname if alias.asname else alias.name
-                    imports["names"][name] = alias.name
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module or ""
-                for alias in node.names:
-                    name = alias.asname if alias.asname else alias.name
-                    imports["from_imports"].add((module, alias.name, name))
-                    imports["names"][name] = f"{module}.{alias.name}"
-
-        return imports
+    # 常见的安全用途写法（仅在当前行中查找）
+    SECURITY_USAGE_PATTERNS = (
+        "choices(string.",  # random.choices(string.ascii_letters, ...)
+        "choices(ascii",    # 生成随机字符串
+        "join(random",      # ''.join(random...)
+        "join(choices",     # ''.join(choices...)
+        "for _ in range",   # 循环生成随机值（常见于生成token）
+    )
+
+    # 上述关键词集合各自编译为一个正则，一次扫描完成匹配
+    _SECURITY_CONTEXT_RE = keyword_regex(SECURITY_CONTEXT_KEYWORDS)
+    _NON_SECURITY_RE = keyword_regex(NON_SECURITY_KEYWORDS)
+    _SECURITY_USAGE_RE = keyword_regex(SECURITY_USAGE_PATTERNS)
+
+    def visitors(self):
+        return {ast.Call: self._visit_call}
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        # 导入信息与源代码行按文件计算一次，各规则共用
+        imports = ctx.imports
+        source_lines = ctx.source_lines
+        lower_lines = ctx.lower_lines
+        context_cache = ctx.cached("RND001.security_context", dict)
+        vuln = self._check_random_call(
+            node, imports, source_lines, lower_lines, ctx.file_path, context_cache
+        )
+        if vuln:
+            ctx.add(vuln)
 
     def _check_random_call(self, node: ast.Call, imports: dict, 
-                           source_lines: List[str], file_path: str) -> Vulnerability:
+                           source_lines: List[str], lower_lines: List[str],
+                           file_path: str,
+                           context_cache: Optional[Dict[int, bool]] = None) -> Vulnerability:
         """检查random模块调用"""
         func_name = self._get_call_name(node)
         if not func_name:
@@ -95,25 +100,22 @@ class InsecureRandomRule(BaseRule):
                 module_name, method_name = parts
                 # 检查是否是random模块的调用
                 actual_module = imports["names"].get(module_name, module_name)
-                if actual_module in ["random", "numpy.random"]:
-                    if method_name in self.UNSAFE_RANDOM_FUNCTIONS.get(actual_module, []):
-                        is_random_call = True
-                        matched_module = actual_module
+                if (actual_module, method_name) in self._UNSAFE_CALLS:
+                    is_random_call = True
+                    matched_module = actual_module
 
         # 检查直接导入的函数 from random import randint
         else:
-            for module, orig_name, alias in imports.get("from_imports", set()):
-                if alias == func_name and module == "random":
-                    if orig_name in self.UNSAFE_RANDOM_FUNCTIONS.get("random", []):
-                        is_random_call = True
-                        matched_module = "random"
-                        break
+            origin = imports["from_aliases"].get(func_name)
+            if origin is not None and origin[0] == "random" and origin in self._UNSAFE_CALLS:
+                is_random_call = True
+                matched_module = "random"
 
         if not is_random_call:
             return None
 
         # 检查是否在安全上下文中使用
-        if not self._is_security_context(node, source_lines):
+        if not self._is_security_context(node, lower_lines, context_cache):
             return None
 
         # 获取代码片段
@@ -132,52 +134,55 @@ class InsecureRandomRule(BaseRule):
 
     def _get_call_name(self, node: ast.Call) -> str:
         """获取函数调用名称"""
-        if isinstance(node.func, ast.Name):
+        if type(node.func) is ast.Name:
             return node.func.id
-        elif isinstance(node.func, ast.Attribute):
-            if isinstance(node.func.value, ast.Name):
+        elif type(node.func) is ast.Attribute:
+            if type(node.func.value) is ast.Name:
                 return f"{node.func.value.id}.{node.func.attr}"
         return None
 
-    def _is_security_context(self, node: ast.Call, source_lines: List[str]) -> bool:
-        """判断是否在安全上下文中使用"""
+    def _is_security_context(self, node: ast.Call, lower_lines: List[str],
+                             cache: Optional[Dict[int, bool]] = None) -> bool:
+        """
+        判断是否在安全上下文中使用
+
+        结果只取决于调用所在行；传入 cache 时按行号记录结果，
+        同一行的多个调用只扫描一次上下文
+
+        Args:
+            node: 调用节点
+            lower_lines: 按文件预先转为小写的源代码行
+            cache: 行号 -> 判断结果
+        """
         line_idx = node.lineno - 1
-        if line_idx < 0 or line_idx >= len(source_lines):
+        if cache is None:
+            return self._line_in_security_context(line_idx, lower_lines)
+        result = cache.get(line_idx)
+        if result is None:
+            result = cache[line_idx] = self._line_in_security_context(line_idx, lower_lines)
+        return result
+
+    def _line_in_security_context(self, line_idx: int, lower_lines: List[str]) -> bool:
+        """判断第 line_idx 行（从 0 开始）附近是否为安全上下文"""
+        if line_idx < 0 or line_idx >= len(lower_lines):
             return False
 
         # 获取当前行和上下文
-        current_line = source_lines[line_idx].lower()
+        current_line = lower_lines[line_idx]
 
         # 检查是否有非安全关键词（降低误报）
-        for keyword in self.NON_SECURITY_KEYWORDS:
-            if keyword in current_line:
-                return False
+        if self._NON_SECURITY_RE.search(current_line):
+            return False
 
         # 检查赋值目标变量名
-        context_lines = []
-        for i in range(max(0, line_idx - 2), min(len(source_lines), line_idx + 3)):
-            context_lines.append(source_lines[i].lower())
-        context_text = " ".join(context_lines)
+        context_text = " ".join(lower_lines[max(0, line_idx - 2):line_idx + 3])
 
         # 检查安全上下文关键词
-        for keyword in self.SECURITY_CONTEXT_KEYWORDS:
-            if keyword in context_text:
-                return True
+        if self._SECURITY_CONTEXT_RE.search(context_text):
+            return True
 
         # 检查常见的安全用途模式
-        security_patterns = [
-            "choices(string.",  # random.choices(string.ascii_letters, ...)
-            "choices(ascii",    # 生成随机字符串
-            "join(random",      # ''.join(random...)
-            "join(choices",     # ''.join(choices...)
-            "for _ in range",   # 循环生成随机值（常见于生成token）
-        ]
-        
-        for pattern in security_patterns:
-            if pattern in current_line:
-                return True
-
-        return False
+        return self._SECURITY_USAGE_RE.search(current_line) is not None
 
     def _get_code_snippet(self, source_lines: List[str], line_number: int) -> str:
         """获取代码片段"""
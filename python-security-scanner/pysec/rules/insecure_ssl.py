@@ -5,93 +5,122 @@
 """
 
 import ast
+import re
 from typing import List, Optional
 
-from .base import BaseRule, register_rule
+from .base import RuleContext, VisitorRule, register_rule
 from ..models import Vulnerability
 
 
 @register_rule
-class InsecureSSLRule(BaseRule):
+class InsecureSSLRule(VisitorRule):
     """不安全的SSL/TLS配置检测规则"""
 
     rule_id = "SSL001"
     rule_name = "不安全的SSL/TLS配置"
     severity = "high"
     description = "检测禁用SSL证书验证或使用不安全SSL配置的情况"
+    # verify=False、ssl._create_*() 与 SSLv*/TLSv* 常量各自必含的片段
+    required_tokens = ("verify", "_create_", "SSLv", "TLSv")
 
     # 不安全的SSL函数调用
-    INSECURE_SSL_FUNCTIONS = {
+    INSECURE_SSL_FUNCTIONS = frozenset({
         "ssl._create_unverified_context",
         "ssl._create_stdlib_context",
-    }
+    })
+    # 上述函数名的最后一段，属性调用据此先行筛选
+    _INSECURE_SSL_TAILS = frozenset(name.rsplit(".", 1)[-1] for name in INSECURE_SSL_FUNCTIONS)
 
     # 过时的SSL/TLS版本常量
-    DEPRECATED_SSL_VERSIONS = {
+    DEPRECATED_SSL_VERSIONS = frozenset({
         "PROTOCOL_SSLv2", "PROTOCOL_SSLv3", "PROTOCOL_SSLv23",
         "PROTOCOL_TLSv1", "PROTOCOL_TLSv1_1",
         "SSLv2_METHOD", "SSLv3_METHOD", "SSLv23_METHOD",
         "TLSv1_METHOD", "TLSv1_1_METHOD",
-    }
+    })
+
+    # 提供上述常量的模块
+    SSL_MODULES = frozenset({"ssl", "OpenSSL.SSL", "OpenSSL"})
+
+    # 所在行出现这些库名的调用也按 HTTP 请求检查 verify=False
+    _HTTP_CLIENT_RE = re.compile("urllib|httpx|aiohttp", re.IGNORECASE)
 
     # 检测 verify=False 的函数
-    VERIFY_FUNCTIONS = {
+    VERIFY_FUNCTIONS = frozenset({
         "get", "post", "put", "delete", "patch", "head", "options",
         "request", "Session", "session",
-    }
-
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查不安全的SSL/TLS配置"""
-        vulnerabilities = []
-        source_lines = source_code.splitlines()
-
-        imports = self._collect_imports(ast_tree)
-
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Call):
-                # 检查 verify=False
-                vuln = self._check_verify_false(node, imports, source_lines, file_path)
-                if vuln:
-                    vulnerabilities.append(vuln)
-                
-                # 检查不安全的SSL函数
-                vuln = self._check_insecure_ssl_call(node, imports, source_lines, file_path)
-                if vuln:
-                    vulnerabilities.append(vuln)
-
-            elif isinstance(node, ast.Attribute):
-                # 检查过时的SSL版本常量
-                vuln = self._check_deprecated_ssl_version(node, imports, source_lines, file_path)
-                if vuln:
-                    vulnerabilities.append(vuln)
-
-        return vulnerabilities
-
-    def _collect_imports(self, ast_tree: ast.AST) -> dict:
-        """收集import信息"""
-        imports = {"names": {}, "from_imports": set(), "has_requests": False}
-
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    name = alias.asname if alias.asname else alias.name
-                    imports["names"][name] = alias.name
-                    if alias.name == "requests":
-                        imports["has_requests"] = True
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module or ""
-                if module == "requests" or module.startswith("requests."):
-                    imports["has_requests"] = True
-                for alias in node.names:
-                    name = alias.asname if alias.asname else alias.name
-                    imports["from_imports"].add((module, alias.name, name))
-                    imports["names"][name] = f"{module}.{alias.name}"
-
-        return imports
+    })
+
+    def visitors(self):
+        return {
+            ast.Call: self._visit_call,
+            ast.Attribute: self._visit_attribute,
+        }
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        imports = self._file_imports(ctx)
+        source_lines = ctx.source_lines
+
+        # 检查 verify=False（没有关键字参数的调用、不涉及 HTTP 库的文件不可能命中）
+        if node.keywords and imports["check_verify"]:
+            vuln = self._check_verify_false(node, imports, source_lines, ctx.file_path)
+            if vuln:
+                ctx.add(vuln)
+
+        # 检查不安全的SSL函数
+        vuln = self._check_insecure_ssl_call(node, imports, source_lines, ctx.file_path)
+        if vuln:
+            ctx.add(vuln)
+
+    def _visit_attribute(self, node: ast.Attribute, ctx: RuleContext):
+        # 检查过时的SSL版本常量（常量名都含 SSLv 或 TLSv，源代码中没有时跳过）
+        imports = self._file_imports(ctx)
+        if not imports["check_versions"]:
+            return
+        vuln = self._check_deprecated_ssl_version(node, imports, ctx.source_lines, ctx.file_path)
+        if vuln:
+            ctx.add(vuln)
+
+    def _file_imports(self, ctx: RuleContext) -> dict:
+        """当前文件的导入信息，附加是否导入了 requests（按文件计算一次）"""
+        return ctx.cached("SSL001.imports", lambda: self._collect_imports(ctx))
+
+    def _collect_imports(self, ctx: RuleContext) -> dict:
+        """收集import信息（复用文件级导入表与节点类型索引）"""
+        index = ctx.index
+        names = ctx.imports["names"]
+        has_requests = any(
+            alias.name == "requests" for node in index.nodes(ast.Import) for alias in node.names
+        ) or any(
+            (node.module or "") == "requests" or (node.module or "").startswith("requests.")
+            for node in index.nodes(ast.ImportFrom)
+        )
+        # 指向 ssl 模块的名称：导入别名，以及未被导入覆盖的模块名本身
+        ssl_aliases = frozenset(
+            [name for name, module in names.items() if module in self.SSL_MODULES]
+            + [name for name in self.SSL_MODULES if name not in names]
+        )
+        source_code = ctx.source_code
+        return {
+            "names": names,
+            "has_requests": has_requests,
+            "ssl_aliases": ssl_aliases,
+            # 逐行的库名探测按整个文件预先判断一次
+            "check_verify": has_requests or self._HTTP_CLIENT_RE.search(source_code) is not None,
+            "check_versions": not source_code or "SSLv" in source_code or "TLSv" in source_code,
+        }
 
     def _check_verify_false(self, node: ast.Call, imports: dict, 
                              source_lines: List[str], file_path: str) -> Optional[Vulnerability]:
         """检查 verify=False 参数"""
+        # 先检查 verify=False 关键字参数：绝大多数调用没有，无需再判断调用对象
+        for keyword in node.keywords:
+            if keyword.arg == "verify":
+                if type(keyword.value) is ast.Constant and keyword.value.value is False:
+                    break
+        else:
+            return None
+
         # 获取函数名
         func_name = self._get_func_name(node)
         if not func_name:
@@ -99,7 +128,7 @@ class InsecureSSLRule(BaseRule):
 
         # 检查是否是requests相关调用
         is_requests_call = False
-        if imports.get("has_requests"):
+        if imports["has_requests"]:
             if func_name in self.VERIFY_FUNCTIONS:
                 is_requests_call = True
             elif "." in func_name:
@@ -108,48 +137,47 @@ class InsecureSSLRule(BaseRule):
                     is_requests_call = True
 
         # 也检查 urllib3, httpx 等
-        current_line = source_lines[node.lineno - 1].lower() if node.lineno <= len(source_lines) else ""
-        if "urllib" in current_line or "httpx" in current_line or "aiohttp" in current_line:
-            is_requests_call = True
+        if not is_requests_call:
+            current_line = source_lines[node.lineno - 1].lower() if node.lineno <= len(source_lines) else ""
+            if "urllib" in current_line or "httpx" in current_line or "aiohttp" in current_line:
+                is_requests_call = True
 
         if not is_requests_call:
             return None
 
-        # 检查 verify=False 关键字参数
-        for keyword in node.keywords:
-            if keyword.arg == "verify":
-                if isinstance(keyword.value, ast.Constant) and keyword.value.value is False:
-                    code_snippet = self._get_code_snippet(source_lines, node.lineno)
-                    return self._create_vulnerability(
-                        file_path=file_path,
-                        line_number=node.lineno,
-                        column=node.col_offset,
-                        code_snippet=code_snippet,
-                        description="禁用了SSL证书验证 (verify=False)，这会使应用程序容易受到中间人攻击。",
-                        suggestion="请移除 verify=False 或设置 verify=True。"
-                                   "如需使用自签名证书，请使用 verify='/path/to/cert.pem' 指定证书。",
-                    )
-
-        return None
+        code_snippet = self._get_code_snippet(source_lines, node.lineno)
+        return self._create_vulnerability(
+            file_path=file_path,
+            line_number=node.lineno,
+            column=node.col_offset,
+            code_snippet=code_snippet,
+            description="禁用了SSL证书验证 (verify=False)，这会使应用程序容易受到中间人攻击。",
+            suggestion="请移除 verify=False 或设置 verify=True。"
+                       "如需使用自签名证书，请使用 verify='/path/to/cert.pem' 指定证书。",
+        )
 
     def _check_insecure_ssl_call(self, node: ast.Call, imports: dict,
                                   source_lines: List[str], file_path: str) -> Optional[Vulnerability]:
         """检查不安全的SSL函数调用"""
+        # x.y.attr() 形式的最后一段不是不安全函数名时无需还原完整名称
+        func = node.func
+        if type(func) is ast.Attribute and func.attr not in self._INSECURE_SSL_TAILS:
+            return None
+
         call_name = self._get_full_call_name(node, imports)
         if not call_name:
             return None
 
-        for insecure_func in self.INSECURE_SSL_FUNCTIONS:
-            if call_name.endswith(insecure_func) or insecure_func in call_name:
-                code_snippet = self._get_code_snippet(source_lines, node.lineno)
-                return self._create_vulnerability(
-                    file_path=file_path,
-                    line_number=node.lineno,
-                    column=node.col_offset,
-                    code_snippet=code_snippet,
-                    description=f"使用了不安全的SSL上下文创建函数 {insecure_func}，这会禁用证书验证。",
-                    suggestion="请使用 ssl.create_default_context() 创建安全的SSL上下文。",
-                )
+        if call_name in self.INSECURE_SSL_FUNCTIONS:
+            code_snippet = self._get_code_snippet(source_lines, node.lineno)
+            return self._create_vulnerability(
+                file_path=file_path,
+                line_number=node.lineno,
+                column=node.col_offset,
+                code_snippet=code_snippet,
+                description=f"使用了不安全的SSL上下文创建函数 {call_name}，这会禁用证书验证。",
+                suggestion="请使用 ssl.create_default_context() 创建安全的SSL上下文。",
+            )
 
         return None
 
@@ -158,10 +186,8 @@ class InsecureSSLRule(BaseRule):
         """检查过时的SSL版本常量"""
         if node.attr in self.DEPRECATED_SSL_VERSIONS:
             # 确认是ssl模块的属性
-            if isinstance(node.value, ast.Name):
-                module_name = node.value.id
-                actual_module = imports["names"].get(module_name, module_name)
-                if actual_module in ["ssl", "OpenSSL.SSL", "OpenSSL"]:
+            if type(node.value) is ast.Name:
+                if node.value.id in imports["ssl_aliases"]:
                     code_snippet = self._get_code_snippet(source_lines, node.lineno)
                     return self._create_vulnerability(
                         file_path=file_path,
@@ -177,26 +203,29 @@ class InsecureSSLRule(BaseRule):
 
     def _get_func_name(self, node: ast.Call) -> Optional[str]:
         """获取函数名"""
-        if isinstance(node.func, ast.Name):
-            return node.func.id
-        elif isinstance(node.func, ast.Attribute):
-            return node.func.attr
+        func = node.func
+        if type(func) is ast.Name:
+            return func.id
+        elif type(func) is ast.Attribute:
+            return func.attr
         return None
 
     def _get_full_call_name(self, node: ast.Call, imports: dict) -> Optional[str]:
-        """获取完整的函数调用名称"""
-        if isinstance(node.func, ast.Attribute):
+        """获取完整的函数调用名称（开头的名称按导入别名还原为实际模块/函数）"""
+        names = imports["names"]
+        func = node.func
+        if type(func) is ast.Attribute:
             parts = []
-            current = node.func
-            while isinstance(current, ast.Attribute):
+            current = func
+            while type(current) is ast.Attribute:
                 parts.append(current.attr)
                 current = current.value
-            if isinstance(current, ast.Name):
-                parts.append(current.id)
+            if type(current) is ast.Name:
+                parts.append(names.get(current.id, current.id))
             parts.reverse()
             return ".".join(parts)
-        elif isinstance(node.func, ast.Name):
-            return node.func.id
+        elif type(func) is ast.Name:
+            return names.get(func.id, func.id)
         return None
 
     def _get_code_snippet(self, source_lines: List[str], line_number: int) -> str:
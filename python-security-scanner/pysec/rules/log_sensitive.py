@@ -5,14 +5,17 @@
 """
 
 import ast
+import functools
+import re
 from typing import List, Optional, Set
 
-from .base import BaseRule, register_rule
+from ._ast_fast import str_const
+from .base import RuleContext, VisitorRule, keyword_regex, register_rule
 from ..models import Vulnerability
 
 
 @register_rule
-class LogSensitiveInfoRule(BaseRule):
+class LogSensitiveInfoRule(VisitorRule):
     """日志敏感信息泄露检测规则"""
 
     rule_id = "LOG001"
@@ -21,16 +24,16 @@ class LogSensitiveInfoRule(BaseRule):
     description = "检测日志中包含密码、令牌等敏感信息的情况"
 
     # 日志函数
-    LOG_FUNCTIONS = {
+    LOG_FUNCTIONS = frozenset({
         "debug", "info", "warning", "warn", "error", "critical",
         "exception", "log", "fatal",
-    }
+    })
 
     # 日志模块/对象名称
-    LOG_MODULES = {
+    LOG_MODULES = frozenset({
         "logger", "logging", "log", "logs", "_logger", "app_logger",
         "console", "stdout", "stderr",
-    }
+    })
 
     # 敏感变量名关键词
     SENSITIVE_KEYWORDS = {
@@ -41,22 +44,21 @@ class LogSensitiveInfoRule(BaseRule):
         "credit_card", "creditcard", "ssn", "social_security",
         "bank_account", "bankaccount", "pin", "cvv", "card_number",
     }
+    # 合并为一个正则，一次扫描完成匹配
+    _SENSITIVE_RE = keyword_regex(SENSITIVE_KEYWORDS)
+    # 变量名转小写后匹配，源代码中须出现任一关键词（忽略大小写）
+    required_pattern = re.compile(_SENSITIVE_RE.pattern, re.IGNORECASE)
 
     # print 函数也需要检查
-    PRINT_FUNCTIONS = {"print"}
+    PRINT_FUNCTIONS = frozenset({"print"})
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查日志敏感信息泄露"""
-        vulnerabilities = []
-        source_lines = source_code.splitlines()
+    def visitors(self):
+        return {ast.Call: self._visit_call}
 
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Call):
-                vuln = self._check_log_call(node, source_lines, file_path)
-                if vuln:
-                    vulnerabilities.append(vuln)
-
-        return vulnerabilities
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        vuln = self._check_log_call(node, ctx.source_lines, ctx.file_path)
+        if vuln:
+            ctx.add(vuln)
 
     def _check_log_call(self, node: ast.Call, source_lines: List[str], 
                         file_path: str) -> Optional[Vulnerability]:
@@ -70,7 +72,7 @@ class LogSensitiveInfoRule(BaseRule):
             return None
 
         code_snippet = self._get_code_snippet(source_lines, node.lineno)
-        sensitive_list = ", ".join(sensitive_vars)
+        sensitive_list = ", ".join(sorted(sensitive_vars))
 
         return self._create_vulnerability(
             file_path=file_path,
@@ -84,108 +86,79 @@ class LogSensitiveInfoRule(BaseRule):
 
     def _is_log_call(self, node: ast.Call) -> bool:
         """判断是否是日志调用"""
-        # logger.info() 形式
-        if isinstance(node.func, ast.Attribute):
-            method_name = node.func.attr.lower()
-            if method_name in self.LOG_FUNCTIONS:
-                # 检查是否是日志对象的方法
-                if isinstance(node.func.value, ast.Name):
-                    obj_name = node.func.value.id.lower()
-                    if obj_name in self.LOG_MODULES:
-                        return True
-                    # 任何 xxx.info(), xxx.debug() 等都可能是日志
-                    if method_name in self.LOG_FUNCTIONS:
-                        return True
-                # logging.info() 形式
-                elif isinstance(node.func.value, ast.Attribute):
-                    return True
-                return True
-
-        # print() 函数
-        elif isinstance(node.func, ast.Name):
-            if node.func.id.lower() in self.PRINT_FUNCTIONS:
-                return True
-            # logging.info 等直接导入的情况
-            if node.func.id.lower() in self.LOG_FUNCTIONS:
-                return True
+        func = node.func
+        func_type = type(func)
+        # logger.info()、logging.info() 形式；任何 xxx.info()、xxx.debug() 等都可能是日志，
+        # 不论调用对象是否在 LOG_MODULES 中
+        if func_type is ast.Attribute:
+            return func.attr.lower() in self.LOG_FUNCTIONS
+
+        # print() 函数，以及 logging.info 等直接导入的情况
+        if func_type is ast.Name:
+            name = func.id.lower()
+            return name in self.PRINT_FUNCTIONS or name in self.LOG_FUNCTIONS
 
         return False
 
     def _find_sensitive_variables(self, node: ast.Call) -> Set[str]:
-        """查找调用参数中的敏感变量"""
+        """
+        查找调用参数中的敏感变量
+
+        报告中需要列出全部敏感变量，因此不在首个命中处提前结束；
+        所有位置参数与关键字参数的值放入同一个栈中一次遍历
+        """
+        roots = list(node.args)
+        roots.extend(keyword.value for keyword in node.keywords if keyword.value)
+        return self._collect_sensitive(roots)
+
+    def _collect_sensitive(self, stack: List[ast.AST]) -> Set[str]:
+        """
+        从若干子树中提取敏感变量名（会消耗传入的列表）
+
+        f-string、字符串拼接、str(x)/format() 调用、元组/列表等只是容器，
+        敏感信息都来自子树中的变量名、属性名和字符串下标，
+        因此只需用显式栈遍历一次子树
+        """
         sensitive_vars = set()
+        is_sensitive = self._is_sensitive_name
+        children = ast.iter_child_nodes
+        pop = stack.pop
+        push = stack.extend
 
-        # 检查所有参数
-        for arg in node.args:
-            sensitive_vars.update(self._extract_sensitive_from_node(arg))
+        while stack:
+            current = pop()
+            node_type = type(current)
 
-        # 检查关键字参数
-        for keyword in node.keywords:
-            if keyword.value:
-                sensitive_vars.update(self._extract_sensitive_from_node(keyword.value))
+            if node_type is ast.Name:
+                if is_sensitive(current.id):
+                    sensitive_vars.add(current.id)
+                continue
 
-        return sensitive_vars
+            if node_type is ast.Attribute:  # obj.password
+                if is_sensitive(current.attr):
+                    sensitive_vars.add(current.attr)
 
-    def _extract_sensitive_from_node(self, node: ast.AST) -> Set[str]:
-        """从AST节点中提取敏感变量名"""
-        sensitive_vars = set()
+            elif node_type is ast.Subscript:  # dict['password']
+                key = str_const(current.slice)
+                if key is not None and is_sensitive(key):
+                    sensitive_vars.add(f"['{key}']")
 
-        if isinstance(node, ast.Name):
-            if self._is_sensitive_name(node.id):
-                sensitive_vars.add(node.id)
-
-        elif isinstance(node, ast.JoinedStr):  # f-string
-            for value in node.values:
-                if isinstance(value, ast.FormattedValue):
-                    sensitive_vars.update(self._extract_sensitive_from_node(value.value))
-
-        elif isinstance(node, ast.FormattedValue):
-            sensitive_vars.update(self._extract_sensitive_from_node(node.value))
-
-        elif isinstance(node, ast.BinOp):  # 字符串拼接
-            sensitive_vars.update(self._extract_sensitive_from_node(node.left))
-            sensitive_vars.update(self._extract_sensitive_from_node(node.right))
-
-        elif isinstance(node, ast.Call):  # 函数调用如 str(password)
-            for arg in node.args:
-                sensitive_vars.update(self._extract_sensitive_from_node(arg))
-            # 检查 .format() 调用
-            if isinstance(node.func, ast.Attribute) and node.func.attr == "format":
-                for arg in node.args:
-                    sensitive_vars.update(self._extract_sensitive_from_node(arg))
-                for kw in node.keywords:
-                    if kw.value:
-                        sensitive_vars.update(self._extract_sensitive_from_node(kw.value))
-
-        elif isinstance(node, ast.Subscript):  # dict['password']
-            if isinstance(node.slice, ast.Constant):
-                if isinstance(node.slice.value, str) and self._is_sensitive_name(node.slice.value):
-                    sensitive_vars.add(f"['{node.slice.value}']")
-
-        elif isinstance(node, ast.Attribute):  # obj.password
-            if self._is_sensitive_name(node.attr):
-                sensitive_vars.add(node.attr)
-
-        elif isinstance(node, ast.Tuple) or isinstance(node, ast.List):
-            for elt in node.elts:
-                sensitive_vars.update(self._extract_sensitive_from_node(elt))
-
-        # 递归检查子节点
-        for child in ast.iter_child_nodes(node):
-            sensitive_vars.update(self._extract_sensitive_from_node(child))
+            push(children(current))
 
         return sensitive_vars
 
     def _is_sensitive_name(self, name: str) -> bool:
         """判断变量名是否敏感"""
-        name_lower = name.lower()
-        for keyword in self.SENSITIVE_KEYWORDS:
-            if keyword in name_lower:
-                return True
-        return False
+        return _is_sensitive_log_name(name)
 
     def _get_code_snippet(self, source_lines: List[str], line_number: int) -> str:
         """获取代码片段"""
         if 0 < line_number <= len(source_lines):
             return source_lines[line_number - 1].strip()
         return ""
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_sensitive_log_name(name: str) -> bool:
+    """判断变量名是否敏感（同一标识符在各文件中反复出现，结果按名称缓存）"""
+    return LogSensitiveInfoRule._SENSITIVE_RE.search(name.lower()) is not None
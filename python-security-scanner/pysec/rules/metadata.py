@@ -5,50 +5,55 @@
 用于生成 SARIF 报告和其他工具集成。
 """
 
-# 规则帮助URI映射（链接到详细解释）
-RULE_HELP_URIS = {
-    "SEC001": "https://cwe.mitre.org/data/definitions/95.html",  # CWE-95: Eval Injection
-    "SEC002": "https://cwe.mitre.org/data/definitions/95.html",  # CWE-95: Eval Injection
-    "SEC003": "https://cwe.mitre.org/data/definitions/502.html", # CWE-502: Deserialization
-    "SEC004": "https://cwe.mitre.org/data/definitions/78.html",  # CWE-78: OS Command Injection
-    "SEC005": "https://cwe.mitre.org/data/definitions/798.html", # CWE-798: Hardcoded Credentials
+# 规则元数据表：帮助URI（链接到详细解释）、CWE分类、OWASP分类、详细描述、修复建议
+RULE_METADATA = {
+    "SEC001": {
+        "help_uri": "https://cwe.mitre.org/data/definitions/95.html",  # CWE-95: Eval Injection
+        "cwe_id": "CWE-95",
+        "owasp_category": "A03:2021-Injection",
+        "description": "检测到 exec() 函数的使用，这可能允许攻击者执行任意代码。",
+        "suggestion": "避免使用 exec()，考虑使用 ast.literal_eval() 或更安全的替代方案。",
+    },
+    "SEC002": {
+        "help_uri": "https://cwe.mitre.org/data/definitions/95.html",  # CWE-95: Eval Injection
+        "cwe_id": "CWE-95",
+        "owasp_category": "A03:2021-Injection",
+        "description": "检测到 eval() 函数的使用，这可能允许攻击者执行任意代码。",
+        "suggestion": "避免使用 eval()，考虑使用 ast.literal_eval() 或直接解析表达式。",
+    },
+    "SEC003": {
+        "help_uri": "https://cwe.mitre.org/data/definitions/502.html",  # CWE-502: Deserialization
+        "cwe_id": "CWE-502",
+        "owasp_category": "A08:2021-Software and Data Integrity Failures",
+        "description": "检测到 pickle.loads() 的使用，这可能允许攻击者通过反序列化执行任意代码。",
+        "suggestion": "避免反序列化不受信任的数据，考虑使用 JSON、YAML 或 MessagePack 等更安全的格式。",
+    },
+    "SEC004": {
+        "help_uri": "https://cwe.mitre.org/data/definitions/78.html",  # CWE-78: OS Command Injection
+        "cwe_id": "CWE-78",
+        "owasp_category": "A03:2021-Injection",
+        "description": "检测到 os.system() 的使用，这可能允许攻击者执行任意系统命令。",
+        "suggestion": "使用 subprocess.run() 替代 os.system()，并避免将用户输入直接传递给 shell。",
+    },
+    "SEC005": {
+        "help_uri": "https://cwe.mitre.org/data/definitions/798.html",  # CWE-798: Hardcoded Credentials
+        "cwe_id": "CWE-798",
+        "owasp_category": "A07:2021-Identification and Authentication Failures",
+        "description": "检测到硬编码的密码或密钥，这可能导致敏感信息泄露。",
+        "suggestion": "使用环境变量、配置文件或密钥管理服务存储敏感信息。",
+    },
 }
 
-# 规则CWE分类映射
-RULE_CWE_IDS = {
-    "SEC001": "CWE-95",
-    "SEC002": "CWE-95",
-    "SEC003": "CWE-502",
-    "SEC004": "CWE-78",
-    "SEC005": "CWE-798",
-}
+# 按字段拆分的映射（保持原有接口）
+RULE_HELP_URIS = {rule_id: meta["help_uri"] for rule_id, meta in RULE_METADATA.items()}
+RULE_CWE_IDS = {rule_id: meta["cwe_id"] for rule_id, meta in RULE_METADATA.items()}
+RULE_OWASP_CATEGORIES = {rule_id: meta["owasp_category"] for rule_id, meta in RULE_METADATA.items()}
+RULE_DESCRIPTIONS = {rule_id: meta["description"] for rule_id, meta in RULE_METADATA.items()}
+RULE_SUGGESTIONS = {rule_id: meta["suggestion"] for rule_id, meta in RULE_METADATA.items()}
 
-# 规则OWASP分类映射
-RULE_OWASP_CATEGORIES = {
-    "SEC001": "A03:2021-Injection",
-    "SEC002": "A03:2021-Injection",
-    "SEC003": "A08:2021-Software and Data Integrity Failures",
-    "SEC004": "A03:2021-Injection",
-    "SEC005": "A07:2021-Identification and Authentication Failures",
-}
+# SARIF 中使用的 CWE 编号（去掉 "CWE-" 前缀，加载时计算一次）
+_CWE_NUMBERS = {rule_id: cwe_id.replace("CWE-", "") for rule_id, cwe_id in RULE_CWE_IDS.items()}
 
-# 规则详细描述
-RULE_DESCRIPTIONS = {
-    "SEC001": "检测到 exec() 函数的使用，这可能允许攻击者执行任意代码。",
-    "SEC002": "检测到 eval() 函数的使用，这可能允许攻击者执行任意代码。",
-    "SEC003": "检测到 pickle.loads() 的使用，这可能允许攻击者通过反序列化执行任意代码。",
-    "SEC004": "检测到 os.system() 的使用，这可能允许攻击者执行任意系统命令。",
-    "SEC005": "检测到硬编码的密码或密钥，这可能导致敏感信息泄露。",
-}
-
-# 规则修复建议
-RULE_SUGGESTIONS = {
-    "SEC001": "避免使用 exec()，考虑使用 ast.literal_eval() 或更安全的替代方案。",
-    "SEC002": "避免使用 eval()，考虑使用 ast.literal_eval() 或直接解析表达式。",
-    "SEC003": "避免反序列化不受信任的数据，考虑使用 JSON、YAML 或 MessagePack 等更安全的格式。",
-    "SEC004": "使用 subprocess.run() 替代 os.system()，并避免将用户输入直接传递给 shell。",
-    "SEC005": "使用环境变量、配置文件或密钥管理服务存储敏感信息。",
-}
 
 def get_rule_metadata(rule_id: str) -> dict:
     """
@@ -60,11 +65,21 @@ def get_rule_metadata(rule_id: str) -> dict:
     Returns:
         包含规则元数据的字典
     """
+    meta = RULE_METADATA.get(rule_id)
+    if meta is None:
+        return {
+            "help_uri": None,
+            "cwe_id": "",
+            "owasp_category": None,
+            "description": f"安全规则: {rule_id}",
+            "suggestion": "请参考安全最佳实践。",
+            "tags": ["security", "python"]
+        }
     return {
-        "help_uri": RULE_HELP_URIS.get(rule_id),
-        "cwe_id": RULE_CWE_IDS.get(rule_id, "").replace("CWE-", ""),
-        "owasp_category": RULE_OWASP_CATEGORIES.get(rule_id),
-        "description": RULE_DESCRIPTIONS.get(rule_id, f"安全规则: {rule_id}"),
-        "suggestion": RULE_SUGGESTIONS.get(rule_id, "请参考安全最佳实践。"),
+        "help_uri": meta["help_uri"],
+        "cwe_id": _CWE_NUMBERS[rule_id],
+        "owasp_category": meta["owasp_category"],
+        "description": meta["description"],
+        "suggestion": meta["suggestion"],
         "tags": ["security", "python"]
-    }
\ No newline at end of file
+    }
@@ -5,29 +5,30 @@
 """
 
 import ast
-from typing import List, Set
+from typing import Dict, FrozenSet, Optional, Tuple
 
-from .base import BaseRule, register_rule
-from ..models import Vulnerability
+from .base import RuleContext, VisitorRule, register_rule
 
 
 @register_rule
-class PathTraversalRule(BaseRule):
+class PathTraversalRule(VisitorRule):
     """路径遍历检测规则"""
 
     rule_id = "PTH001"
     rule_name = "路径遍历风险"
     severity = "medium"
     description = "检测文件操作中可能存在的路径遍历风险"
+    # open()/file() 与 os.*、shutil.*、pathlib.* 调用各自必含的片段
+    required_tokens = ("open", "file", "os", "shutil", "pathlib")
 
     # 文件操作函数
-    FILE_FUNCTIONS: Set[str] = {
+    FILE_FUNCTIONS: FrozenSet[str] = frozenset({
         "open",
         "file",  # Python 2
-    }
+    })
 
     # 文件操作模块方法
-    FILE_METHODS: Set[str] = {
+    FILE_METHODS: FrozenSet[str] = frozenset({
         "os.remove",
         "os.unlink",
         "os.rmdir",
@@ -55,65 +56,72 @@ class PathTraversalRule(BaseRule):
         "shutil.rmtree",
         "pathlib.Path",
         "io.open",
-    }
+    })
 
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        vulnerabilities = []
-
-        for node in ast.walk(ast_tree):
-            if isinstance(node, ast.Call):
-                func_name = self._get_func_name(node)
-
-                # 检查文件操作函数
-                if func_name in self.FILE_FUNCTIONS or func_name in self.FILE_METHODS:
-                    # 检查第一个参数（文件路径）是否来自变量
-                    if node.args and self._is_user_controlled(node.args[0]):
-                        vulnerabilities.append(
-                            self._create_vulnerability(
-                                file_path=file_path,
-                                line_number=node.lineno,
-                                column=node.col_offset,
-                                code_snippet=self._get_source_line(source_code, node.lineno),
-                                description=f"调用 {func_name}() 的路径参数可能来自用户输入，存在路径遍历风险",
-                                suggestion="对文件路径进行严格校验；使用os.path.basename()提取文件名；"
-                                "使用os.path.realpath()解析真实路径后验证是否在允许的目录内",
-                            )
+    # 需要检查的调用：按名称各段组成的元组索引，查找前无需拼接完整名称
+    _FILE_TRIGGERS: Dict[Tuple[str, ...], str] = {
+        tuple(name.split(".")): name
+        for name in (*FILE_FUNCTIONS, *FILE_METHODS, "os.path.join")
+    }
+    call_names = frozenset(parts[-1] for parts in _FILE_TRIGGERS)
+
+    # 可能携带用户输入的节点类型：变量、下标、属性访问与函数调用结果
+    _TAINTED_NODE_TYPES = frozenset({ast.Name, ast.Subscript, ast.Attribute, ast.Call})
+
+    def visitors(self):
+        return {ast.Call: self._visit_call}
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        func_name = self._file_call_name(node)
+        if func_name is None:
+            return
+
+        # 检查文件操作函数
+        if func_name in self.FILE_FUNCTIONS or func_name in self.FILE_METHODS:
+            # 检查第一个参数（文件路径）是否来自变量
+            if node.args and self._is_user_controlled(node.args[0]):
+                ctx.add(
+                    self._node_vulnerability(
+                        ctx,
+                        node,
+                        f"调用 {func_name}() 的路径参数可能来自用户输入，存在路径遍历风险",
+                        "对文件路径进行严格校验；使用os.path.basename()提取文件名；"
+                        "使用os.path.realpath()解析真实路径后验证是否在允许的目录内",
+                    )
+                )
+
+        # 特别检查 os.path.join 的使用
+        if func_name == "os.path.join":
+            # 检查是否有参数来自用户输入
+            for arg in node.args[1:]:  # 跳过第一个基础路径参数
+                if self._is_user_controlled(arg):
+                    ctx.add(
+                        self._node_vulnerability(
+                            ctx,
+                            node,
+                            "os.path.join() 的参数可能来自用户输入，如果包含 '../' 可导致路径遍历",
+                            "在拼接前使用os.path.basename()清理用户输入；"
+                            "拼接后使用os.path.realpath()验证最终路径是否在允许的目录内",
                         )
-
-                # 特别检查 os.path.join 的使用
-                if func_name == "os.path.join":
-                    # 检查是否有参数来自用户输入
-                    for arg in node.args[1:]:  # 跳过第一个基础路径参数
-                        if self._is_user_controlled(arg):
-                            vulnerabilities.append(
-                                self._create_vulnerability(
-                                    file_path=file_path,
-                                    line_number=node.lineno,
-                                    column=node.col_offset,
-                                    code_snippet=self._get_source_line(source_code, node.lineno),
-                                    description="os.path.join() 的参数可能来自用户输入，如果包含 '../' 可导致路径遍历",
-                                    suggestion="在拼接前使用os.path.basename()清理用户输入；"
-                                    "拼接后使用os.path.realpath()验证最终路径是否在允许的目录内",
-                                )
-                            )
-                            break
-
-        return vulnerabilities
-
-    def _get_func_name(self, node: ast.Call) -> str:
-        """获取函数调用的完整名称"""
-        if isinstance(node.func, ast.Name):
-            return node.func.id
-        elif isinstance(node.func, ast.Attribute):
+                    )
+                    break
+
+    def _file_call_name(self, node: ast.Call) -> Optional[str]:
+        """需要检查的文件操作调用返回其完整名称，其他调用返回 None"""
+        func = node.func
+        if type(func) is ast.Name:
+            return self._FILE_TRIGGERS.get((func.id,))
+        elif type(func) is ast.Attribute:
             parts = []
-            current = node.func
-            while isinstance(current, ast.Attribute):
+            current = func
+            while type(current) is ast.Attribute:
                 parts.append(current.attr)
                 current = current.value
-            if isinstance(current, ast.Name):
+            if type(current) is ast.Name:
                 parts.append(current.id)
-            return ".".join(reversed(parts))
-        return ""
+            parts.reverse()
+            return self._FILE_TRIGGERS.get(tuple(parts))
+        return None
 
     def _is_user_controlled(self, node) -> bool:
         """
@@ -128,28 +136,18 @@ class PathTraversalRule(BaseRule):
 
         如果是常量字符串，则认为是安全的
         """
-        if isinstance(node, ast.Constant):
-            # 常量字符串是安全的
-            return False
-        elif isinstance(node, ast.Name):
-            # 变量引用可能来自用户输入
-            return True
-        elif isinstance(node, ast.Subscript):
-            # 下标访问（如 request.args['filename']）
-            return True
-        elif isinstance(node, ast.Attribute):
-            # 属性访问（如 request.filename）
-            return True
-        elif isinstance(node, ast.Call):
-            # 函数调用结果
+        node_type = type(node)
+        # 变量引用、下标访问（如 request.args['filename']）、属性访问（如 request.filename）、
+        # 函数调用结果都可能来自用户输入；常量字符串是安全的
+        if node_type in self._TAINTED_NODE_TYPES:
             return True
-        elif isinstance(node, ast.BinOp):
+        elif node_type is ast.BinOp:
             # 二元操作（字符串拼接等）
             return self._is_user_controlled(node.left) or self._is_user_controlled(node.right)
-        elif isinstance(node, ast.JoinedStr):
+        elif node_type is ast.JoinedStr:
             # f-string
             for value in node.values:
-                if isinstance(value, ast.FormattedValue):
+                if type(value) is ast.FormattedValue:
                     return True
             return False
 
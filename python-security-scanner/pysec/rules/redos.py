@@ -6,14 +6,15 @@
 
 import ast
 import re
-from typing import List, Optional, Tuple
+from typing import Optional, Tuple
 
-from .base import BaseRule, register_rule
+from ._ast_fast import str_const
+from .base import RuleContext, VisitorRule, register_rule
 from ..models import Vulnerability
 
 
 @register_rule
-class ReDoSRule(BaseRule):
+class ReDoSRule(VisitorRule):
     """正则表达式DoS检测规则"""
 
     rule_id = "REX001"
@@ -22,31 +23,55 @@ class ReDoSRule(BaseRule):
     description = "检测可能导致灾难性回溯的正则表达式，可被利用进行DoS攻击"
 
     # re 模块的编译/匹配函数
-    RE_FUNCTIONS = {
+    RE_FUNCTIONS = frozenset({
         "compile", "match", "search", "findall", "finditer",
         "fullmatch", "split", "sub", "subn",
-    }
-
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        """检查正则表达式DoS风险"""
-        vulnerabilities = []
-
-        for node in ast.walk(ast_tree):
-            # 检测 re.compile(), re.match() 等调用
-            if isinstance(node, ast.Call):
-                vuln = self._check_re_call(node, file_path, source_code)
-                if vuln:
-                    vulnerabilities.append(vuln)
-
-        return vulnerabilities
+    })
+    # re.xxx() 与 from re import xxx 后的直接调用都需出现函数名
+    required_tokens = tuple(sorted(RE_FUNCTIONS))
+    call_names = RE_FUNCTIONS
+
+    # 嵌套量词：(内容+量词)+量词
+    _NESTED_QUANTIFIER_RES = tuple(re.compile(p) for p in (
+        r'\([^()]*[\+\*\?]\)+[\+\*\?]',  # (xxx+)+, (xxx*)*, etc.
+        r'\([^()]*\{[0-9,]+\}\)+[\+\*\?]',  # (xxx{1,5})+
+        r'\([^()]*[\+\*\?]\)+\{[0-9,]+\}',  # (xxx+){1,5}
+        r'\(\[[^\]]+\]\)+[\+\*\?]',  # ([a-z])+, ([0-9])*, etc. 字符类嵌套
+    ))
+
+    # 重叠交替：(xxx|yyy)+
+    _ALTERNATION_RE = re.compile(r'\(([^|()]+)\|([^|()]+)\)[\+\*]')
+
+    # 危险的嵌套量词组合
+    _DANGEROUS_COMBO_RES = tuple(re.compile(p) for p in (
+        r'\([^()]*\\w[\+\*]\)+',  # (\w+)+
+        r'\([^()]*\\d[\+\*]\)+',  # (\d+)+
+        r'\([^()]*\.[\+\*]\)+',   # (.*)+
+        r'\([^()]*\[.*\][\+\*]\)+',  # ([a-z]+)+
+    ))
+
+    # 以上所有模式合并为一个交替：不匹配时三类检测都不可能命中，一次扫描即可排除
+    _ANY_RISK_RE = re.compile("|".join(
+        f"(?:{p.pattern})"
+        for p in (*_NESTED_QUANTIFIER_RES, _ALTERNATION_RE, *_DANGEROUS_COMBO_RES)
+    ))
+
+    def visitors(self):
+        return {ast.Call: self._visit_call}
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        # 检测 re.compile(), re.match() 等调用
+        vuln = self._check_re_call(node, ctx.file_path, ctx.source_code)
+        if vuln:
+            ctx.add(vuln)
 
     def _check_re_call(
         self, node: ast.Call, file_path: str, source_code: str
     ) -> Optional[Vulnerability]:
         """检查 re 模块的函数调用"""
         # 检查是否是 re.xxx() 调用
-        if isinstance(node.func, ast.Attribute):
-            if isinstance(node.func.value, ast.Name):
+        if type(node.func) is ast.Attribute:
+            if type(node.func.value) is ast.Name:
                 if node.func.value.id == "re" and node.func.attr in self.RE_FUNCTIONS:
                     # 获取正则表达式参数
                     pattern = self._extract_pattern(node)
@@ -63,7 +88,7 @@ class ReDoSRule(BaseRule):
                             )
 
         # 检查是否是直接调用（如果通过 from re import compile）
-        elif isinstance(node.func, ast.Name):
+        elif type(node.func) is ast.Name:
             if node.func.id in self.RE_FUNCTIONS:
                 pattern = self._extract_pattern(node)
                 if pattern:
@@ -85,18 +110,8 @@ class ReDoSRule(BaseRule):
         if not node.args:
             return None
 
-        # 第一个参数通常是正则表达式
-        pattern_arg = node.args[0]
-
-        # 提取字符串常量
-        if isinstance(pattern_arg, ast.Constant) and isinstance(pattern_arg.value, str):
-            return pattern_arg.value
-
-        # 提取原始字符串 (Python 3.8+)
-        if isinstance(pattern_arg, ast.Str):
-            return pattern_arg.s
-
-        return None
+        # 第一个参数通常是正则表达式；Python 3.8+ 的字符串（含原始字符串）都解析为 ast.Constant
+        return str_const(node.args[0])
 
     def _analyze_pattern(self, pattern: str) -> Optional[dict]:
         """
@@ -105,6 +120,10 @@ class ReDoSRule(BaseRule):
         Returns:
             如果有风险，返回包含 description 和 suggestion 的字典，否则返回 None
         """
+        # 绝大多数正则没有风险，先用合并后的模式一次扫描排除
+        if not self._ANY_RISK_RE.search(pattern):
+            return None
+
         # 检测嵌套量词
         nested_quantifiers = self._detect_nested_quantifiers(pattern)
         if nested_quantifiers:
@@ -140,16 +159,8 @@ class ReDoSRule(BaseRule):
         - (a?)+
         - ([a-z])+  (字符类后接量词)
         """
-        # 匹配：(内容+量词)+量词
-        nested_patterns = [
-            r'\([^()]*[\+\*\?]\)+[\+\*\?]',  # (xxx+)+, (xxx*)*, etc.
-            r'\([^()]*\{[0-9,]+\}\)+[\+\*\?]',  # (xxx{1,5})+
-            r'\([^()]*[\+\*\?]\)+\{[0-9,]+\}',  # (xxx+){1,5}
-            r'\(\[[^\]]+\]\)+[\+\*\?]',  # ([a-z])+, ([0-9])*, etc. 字符类嵌套
-        ]
-
-        for nested_pattern in nested_patterns:
-            match = re.search(nested_pattern, pattern)
+        for nested_pattern in self._NESTED_QUANTIFIER_RES:
+            match = nested_pattern.search(pattern)
             if match:
                 return match.group(0)
 
@@ -163,8 +174,7 @@ class ReDoSRule(BaseRule):
         - (abc|abc)+
         """
         # 简单检测：(xxx|xxx)+ 或 (xxx|yyy)+ 其中 xxx 和 yyy 有共同前缀
-        alternation_pattern = r'\(([^|()]+)\|([^|()]+)\)[\+\*]'
-        matches = re.finditer(alternation_pattern, pattern)
+        matches = self._ALTERNATION_RE.finditer(pattern)
 
         for match in matches:
             left = match.group(1)
@@ -180,12 +190,10 @@ class ReDoSRule(BaseRule):
                 if left.startswith(right) or right.startswith(left):
                     return match.group(0)
 
-                # 检查是否有共同的开头字符或模式
-                if len(left) > 0 and len(right) > 0 and left[0] == right[0]:
-                    # 共同前缀可能导致回溯
-                    common_prefix = self._get_common_prefix(left, right)
-                    if len(common_prefix) >= 2:  # 至少2个字符的共同前缀
-                        return match.group(0)
+                # 检查是否有共同的开头字符或模式：至少2个字符的共同前缀可能导致回溯
+                # （只需比较前两个字符，无需求出完整前缀）
+                if len(left) >= 2 and left[:2] == right[:2]:
+                    return match.group(0)
 
         return None
 
@@ -197,27 +205,9 @@ class ReDoSRule(BaseRule):
         - (\w+)+
         - (.*)+
         """
-        # 检测可能的危险组合
-        dangerous_combos = [
-            r'\([^()]*\\w[\+\*]\)+',  # (\w+)+
-            r'\([^()]*\\d[\+\*]\)+',  # (\d+)+
-            r'\([^()]*\.[\+\*]\)+',   # (.*)+
-            r'\([^()]*\[.*\][\+\*]\)+',  # ([a-z]+)+
-        ]
-
-        for combo_pattern in dangerous_combos:
-            match = re.search(combo_pattern, pattern)
+        for combo_pattern in self._DANGEROUS_COMBO_RES:
+            match = combo_pattern.search(pattern)
             if match:
                 return match.group(0)
 
         return None
-
-    def _get_common_prefix(self, s1: str, s2: str) -> str:
-        """获取两个字符串的公共前缀"""
-        prefix = []
-        for c1, c2 in zip(s1, s2):
-            if c1 == c2:
-                prefix.append(c1)
-            else:
-                break
-        return ''.join(prefix)
@@ -5,15 +5,16 @@ SQL注入检测规则
 """
 
 import ast
+import functools
 import re
-from typing import List
 
-from .base import BaseRule, register_rule
+from ._ast_fast import str_const
+from .base import RuleContext, VisitorRule, register_rule
 from ..models import Vulnerability
 
 
 @register_rule
-class SQLInjectionRule(BaseRule):
+class SQLInjectionRule(VisitorRule):
     """SQL注入检测规则"""
 
     rule_id = "SQL001"
@@ -35,112 +36,115 @@ class SQLInjectionRule(BaseRule):
         r"\bEXEC\b",
         r"\bEXECUTE\b",
     ]
-
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        vulnerabilities = []
-
-        for node in ast.walk(ast_tree):
-            vuln = None
-
-            # 检测 % 格式化: "SELECT * FROM users WHERE id = %s" % user_id
-            if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod):
-                if self._is_sql_string(node.left):
-                    vuln = self._create_sql_vuln(
-                        file_path, node, source_code, "使用 % 格式化拼接SQL语句，存在SQL注入风险"
-                    )
-
-            # 检测 f-string: f"SELECT * FROM users WHERE id = {user_id}"
-            elif isinstance(node, ast.JoinedStr):
-                # f-string 包含变量插值
-                has_variable = any(isinstance(v, ast.FormattedValue) for v in node.values)
-                if has_variable:
-                    full_str = self._reconstruct_fstring(node)
-                    if self._contains_sql(full_str):
-                        vuln = self._create_sql_vuln(
-                            file_path,
-                            node,
-                            source_code,
-                            "使用 f-string 拼接SQL语句，存在SQL注入风险",
-                        )
-
-            # 检测 .format(): "SELECT * FROM users WHERE id = {}".format(user_id)
-            elif isinstance(node, ast.Call):
-                if self._is_format_call(node) and self._is_sql_format_string(node):
-                    vuln = self._create_sql_vuln(
-                        file_path, node, source_code, "使用 .format() 拼接SQL语句，存在SQL注入风险"
-                    )
-
-            # 检测字符串连接: "SELECT * FROM users WHERE id = " + user_id
-            elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
-                if self._is_string_concat_sql(node):
-                    vuln = self._create_sql_vuln(
-                        file_path, node, source_code, "使用 + 连接拼接SQL语句，存在SQL注入风险"
-                    )
-
-            if vuln:
-                vulnerabilities.append(vuln)
-
-        return vulnerabilities
+    # 合并为一个忽略大小写的正则，一次扫描完成匹配，也无需先转大写
+    _SQL_RE = re.compile("|".join(SQL_PATTERNS), re.IGNORECASE)
+    # 源代码中须出现任一关键字；字符串里的转义（如 "\nWHERE"）会改变单词边界，因此不要求 \b
+    required_pattern = re.compile(
+        "|".join(pattern.replace(r"\b", "") for pattern in SQL_PATTERNS), re.IGNORECASE
+    )
+
+    # 只检查 .format() 调用
+    call_names = frozenset({"format"})
+
+    def visitors(self):
+        return {
+            ast.BinOp: self._visit_binop,
+            ast.JoinedStr: self._visit_joinedstr,
+            ast.Call: self._visit_call,
+        }
+
+    def _visit_binop(self, node: ast.BinOp, ctx: RuleContext):
+        op_type = type(node.op)
+
+        # 检测 % 格式化: "SELECT * FROM users WHERE id = %s" % user_id
+        if op_type is ast.Mod:
+            if self._is_sql_string(node.left):
+                ctx.add(self._create_sql_vuln(ctx, node, "使用 % 格式化拼接SQL语句，存在SQL注入风险"))
+
+        # 检测字符串连接: "SELECT * FROM users WHERE id = " + user_id
+        elif op_type is ast.Add:
+            if self._is_string_concat_sql(node):
+                ctx.add(self._create_sql_vuln(ctx, node, "使用 + 连接拼接SQL语句，存在SQL注入风险"))
+
+    def _visit_joinedstr(self, node: ast.JoinedStr, ctx: RuleContext):
+        # 检测 f-string: f"SELECT * FROM users WHERE id = {user_id}"
+        # f-string 包含变量插值
+        has_variable = any(type(v) is ast.FormattedValue for v in node.values)
+        if has_variable:
+            full_str = self._reconstruct_fstring(node)
+            if self._contains_sql(full_str):
+                ctx.add(self._create_sql_vuln(ctx, node, "使用 f-string 拼接SQL语句，存在SQL注入风险"))
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        # 检测 .format(): "SELECT * FROM users WHERE id = {}".format(user_id)
+        if self._is_format_call(node) and self._is_sql_format_string(node):
+            ctx.add(self._create_sql_vuln(ctx, node, "使用 .format() 拼接SQL语句，存在SQL注入风险"))
 
     def _is_sql_string(self, node) -> bool:
         """判断节点是否为SQL语句字符串"""
-        if isinstance(node, ast.Constant) and isinstance(node.value, str):
-            return self._contains_sql(node.value)
-        return False
+        value = str_const(node)
+        return value is not None and self._contains_sql(value)
 
     def _contains_sql(self, text: str) -> bool:
         """检查字符串是否包含SQL关键字"""
         if not text:
             return False
-        text_upper = text.upper()
-        return any(re.search(pattern, text_upper) for pattern in self.SQL_PATTERNS)
+        return _contains_sql_keyword(text)
 
     def _reconstruct_fstring(self, node: ast.JoinedStr) -> str:
         """重构f-string的字符串内容"""
         parts = []
         for value in node.values:
-            if isinstance(value, ast.Constant):
+            value_type = type(value)
+            if value_type is ast.Constant:
                 parts.append(str(value.value))
-            elif isinstance(value, ast.FormattedValue):
+            elif value_type is ast.FormattedValue:
                 parts.append("{}")  # 占位符
         return "".join(parts)
 
     def _is_format_call(self, node: ast.Call) -> bool:
         """检查是否为 .format() 调用"""
-        if isinstance(node.func, ast.Attribute):
-            return node.func.attr == "format"
-        return False
+        func = node.func
+        return type(func) is ast.Attribute and func.attr == "format"
 
     def _is_sql_format_string(self, node: ast.Call) -> bool:
         """检查 .format() 调用的字符串是否为SQL"""
-        if isinstance(node.func, ast.Attribute):
-            if isinstance(node.func.value, ast.Constant):
-                return self._contains_sql(str(node.func.value.value))
+        func = node.func
+        if type(func) is ast.Attribute and type(func.value) is ast.Constant:
+            return self._contains_sql(str(func.value.value))
         return False
 
     def _is_string_concat_sql(self, node: ast.BinOp) -> bool:
-        """检查字符串连接是否涉及SQL"""
-
-        # 递归检查左右操作数
-        def check_node(n):
-            if isinstance(n, ast.Constant) and isinstance(n.value, str):
-                return self._contains_sql(n.value)
-            elif isinstance(n, ast.BinOp) and isinstance(n.op, ast.Add):
-                return check_node(n.left) or check_node(n.right)
-            return False
-
-        return check_node(node)
+        """
+        检查字符串连接是否涉及SQL
+
+        用显式栈展开 + 连接的左右操作数（长拼接链不受递归深度限制），
+        找到第一个含SQL关键字的字符串常量即返回
+        """
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            n_type = type(n)
+            if n_type is ast.Constant:
+                if type(n.value) is str and self._contains_sql(n.value):
+                    return True
+            elif n_type is ast.BinOp and type(n.op) is ast.Add:
+                stack.append(n.right)
+                stack.append(n.left)
+        return False
 
-    def _create_sql_vuln(
-        self, file_path: str, node: ast.AST, source_code: str, detail: str
-    ) -> Vulnerability:
+    def _create_sql_vuln(self, ctx: RuleContext, node: ast.AST, detail: str) -> Vulnerability:
         """创建SQL注入漏洞对象"""
-        return self._create_vulnerability(
-            file_path=file_path,
-            line_number=node.lineno,
-            column=node.col_offset,
-            code_snippet=self._get_source_line(source_code, node.lineno),
-            description=detail,
-            suggestion="使用参数化查询（如 cursor.execute(sql, params)）代替字符串拼接，"
+        return self._node_vulnerability(
+            ctx,
+            node,
+            detail,
+            "使用参数化查询（如 cursor.execute(sql, params)）代替字符串拼接，"
             "或使用ORM框架进行数据库操作",
         )
+
+
+@functools.lru_cache(maxsize=4096)
+def _contains_sql_keyword(text: str) -> bool:
+    """字符串是否包含SQL关键字（同样的字符串常量在各文件中反复出现，结果按内容缓存）"""
+    return SQLInjectionRule._SQL_RE.search(text) is not None
@@ -5,61 +5,61 @@ SSRF (服务端请求伪造) 检测规则
 """
 
 import ast
-from typing import List, Set
+from typing import Dict, Optional
 
-from .base import BaseRule, register_rule
+from .base import RuleContext, VisitorRule, dotted_name, register_rule
 from ..models import Vulnerability
 
 
 @register_rule
-class SSRFRule(BaseRule):
+class SSRFRule(VisitorRule):
     """SSRF检测规则"""
 
     rule_id = "SSRF001"
     rule_name = "SSRF服务端请求伪造风险"
     severity = "high"
     description = "检测用户输入直接作为URL传递给HTTP请求函数的风险代码"
+    # requests.xxx() 与 urllib 各函数调用各自必含的片段
+    required_tokens = ("requests", "urlopen", "urlretrieve", "Request")
 
     # requests 库的危险函数
-    REQUESTS_METHODS = {"get", "post", "put", "delete", "patch", "head", "options", "request"}
+    REQUESTS_METHODS = frozenset({"get", "post", "put", "delete", "patch", "head", "options", "request"})
 
     # urllib 库的危险函数
-    URLLIB_FUNCTIONS = {"urlopen", "urlretrieve", "Request"}
-
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        vulnerabilities = []
-
-        for node in ast.walk(ast_tree):
-            vuln = None
-
-            if isinstance(node, ast.Call):
-                # 检测 requests.get(url) 等调用
-                vuln = self._check_requests_call(node, file_path, source_code)
-
-                # 检测 urllib.request.urlopen(url) 等调用
-                if not vuln:
-                    vuln = self._check_urllib_call(node, file_path, source_code)
-
-            if vuln:
-                vulnerabilities.append(vuln)
-
-        return vulnerabilities
-
-    def _check_requests_call(
+    URLLIB_FUNCTIONS = frozenset({"urlopen", "urlretrieve", "Request"})
+
+    call_names = REQUESTS_METHODS | URLLIB_FUNCTIONS
+
+    # 需要检查的调用：{调用的完整名称: 报告中使用的名称}
+    # requests.get() 等；urllib.request.urlopen()、request.urlopen()（from urllib import request）
+    # 与 urlopen()（from urllib.request import urlopen）
+    _DANGEROUS_CALLS: Dict[str, str] = {
+        **{f"requests.{method}": f"requests.{method}" for method in REQUESTS_METHODS},
+        **{
+            f"{prefix}{func}": f"urllib.request.{func}"
+            for func in URLLIB_FUNCTIONS
+            for prefix in ("urllib.request.", "request.", "")
+        },
+    }
+
+    # 直接视为可能来自用户输入的节点类型
+    _USER_INPUT_TYPES = frozenset({ast.Name, ast.Subscript, ast.Call})
+
+    def visitors(self):
+        return {ast.Call: self._visit_call}
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        # 检测 requests.get(url)、urllib.request.urlopen(url) 等调用
+        vuln = self._check_http_call(node, ctx.file_path, ctx.source_code)
+        if vuln:
+            ctx.add(vuln)
+
+    def _check_http_call(
         self, node: ast.Call, file_path: str, source_code: str
-    ) -> Vulnerability:
-        """检测 requests 库的调用"""
-        if not isinstance(node.func, ast.Attribute):
-            return None
-
-        # 检查是否是 requests.get/post/... 调用
-        if not isinstance(node.func.value, ast.Name):
-            return None
-
-        if node.func.value.id != "requests":
-            return None
-
-        if node.func.attr not in self.REQUESTS_METHODS:
+    ) -> Optional[Vulnerability]:
+        """检测 requests 与 urllib 库的调用"""
+        call_name = self._DANGEROUS_CALLS.get(dotted_name(node.func))
+        if call_name is None:
             return None
 
         # 检查第一个参数（URL）
@@ -82,64 +82,7 @@ class SSRFRule(BaseRule):
                 line_number=node.lineno,
                 column=node.col_offset,
                 code_snippet=self._get_source_line(source_code, node.lineno),
-                description=f"requests.{node.func.attr}() 的URL参数可能来自用户输入，存在SSRF风险",
-                suggestion="建议对URL进行白名单验证，只允许访问可信的域名。可使用 urllib.parse 解析URL并验证域名。",
-                severity=self.severity,
-            )
-
-        return None
-
-    def _check_urllib_call(self, node: ast.Call, file_path: str, source_code: str) -> Vulnerability:
-        """检测 urllib 库的调用"""
-        func_name = None
-        module_name = None
-
-        # 检查 urllib.request.urlopen(url) 形式
-        if isinstance(node.func, ast.Attribute):
-            func_name = node.func.attr
-            # urllib.request.urlopen
-            if isinstance(node.func.value, ast.Attribute):
-                if node.func.value.attr == "request":
-                    if isinstance(node.func.value.value, ast.Name):
-                        if node.func.value.value.id == "urllib":
-                            module_name = "urllib.request"
-            # request.urlopen (from urllib import request)
-            elif isinstance(node.func.value, ast.Name):
-                if node.func.value.id == "request":
-                    module_name = "urllib.request"
-
-        # 检查 urlopen(url) 直接调用形式 (from urllib.request import urlopen)
-        elif isinstance(node.func, ast.Name):
-            if node.func.id in self.URLLIB_FUNCTIONS:
-                func_name = node.func.id
-                module_name = "urllib.request"
-
-        if not func_name or func_name not in self.URLLIB_FUNCTIONS:
-            return None
-
-        if not module_name:
-            return None
-
-        # 获取URL参数
-        if not node.args:
-            url_arg = None
-            for keyword in node.keywords:
-                if keyword.arg == "url":
-                    url_arg = keyword.value
-                    break
-            if not url_arg:
-                return None
-        else:
-            url_arg = node.args[0]
-
-        # 检查URL参数是否可能来自用户输入
-        if self._is_potentially_user_input(url_arg):
-            return self._create_vulnerability(
-                file_path=file_path,
-                line_number=node.lineno,
-                column=node.col_offset,
-                code_snippet=self._get_source_line(source_code, node.lineno),
-                description=f"{module_name}.{func_name}() 的URL参数可能来自用户输入，存在SSRF风险",
+                description=f"{call_name}() 的URL参数可能来自用户输入，存在SSRF风险",
                 suggestion="建议对URL进行白名单验证，只允许访问可信的域名。可使用 urllib.parse 解析URL并验证域名。",
                 severity=self.severity,
             )
@@ -148,37 +91,27 @@ class SSRFRule(BaseRule):
 
     def _is_potentially_user_input(self, node: ast.AST) -> bool:
         """判断节点是否可能来自用户输入"""
-        # 如果是变量名，视为可能的用户输入
-        if isinstance(node, ast.Name):
-            return True
+        node_type = type(node)
 
-        # 如果是下标访问，如 request.args['url']、data['url']
-        if isinstance(node, ast.Subscript):
-            return True
-
-        # 如果是属性访问后的方法调用结果，如 request.args.get('url')
-        if isinstance(node, ast.Call):
+        # 变量名、下标访问（如 request.args['url']）、函数调用结果（如 request.args.get('url')）
+        if node_type in self._USER_INPUT_TYPES:
             return True
 
         # 如果是 f-string，检查是否包含变量
-        if isinstance(node, ast.JoinedStr):
+        if node_type is ast.JoinedStr:
             for value in node.values:
-                if isinstance(value, ast.FormattedValue):
+                if type(value) is ast.FormattedValue:
                     return True
 
-        # 如果是字符串拼接
-        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
-            return self._is_potentially_user_input(node.left) or self._is_potentially_user_input(
-                node.right
-            )
-
-        # 如果是 % 格式化
-        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod):
-            return True
-
-        # 如果是 .format() 调用
-        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
-            if node.func.attr == "format":
+        elif node_type is ast.BinOp:
+            op_type = type(node.op)
+            # 如果是字符串拼接
+            if op_type is ast.Add:
+                return self._is_potentially_user_input(node.left) or self._is_potentially_user_input(
+                    node.right
+                )
+            # 如果是 % 格式化
+            if op_type is ast.Mod:
                 return True
 
         return False
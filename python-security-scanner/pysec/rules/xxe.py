@@ -5,117 +5,84 @@ XXE (XML外部实体注入) 检测规则
 """
 
 import ast
-from typing import List
+from typing import Dict, Optional
 
-from .base import BaseRule, register_rule
+from .base import RuleContext, VisitorRule, register_rule, resolved_name
 from ..models import Vulnerability
 
 
 @register_rule
-class XXERule(BaseRule):
+class XXERule(VisitorRule):
     """XXE检测规则"""
 
     rule_id = "XXE001"
     rule_name = "XML外部实体注入风险"
     severity = "high"
     description = "检测不安全的XML解析，可能导致XXE攻击"
+    # 危险函数名各自必含的片段（parse 覆盖 iterparse/parseString，XML 覆盖 XMLParser）
+    required_tokens = ("parse", "fromstring", "XML", "HTML", "make_parser")
 
     # xml.etree.ElementTree 的危险函数
-    ET_DANGEROUS_FUNCS = {"parse", "fromstring", "iterparse", "XMLParser"}
+    ET_DANGEROUS_FUNCS = frozenset({"parse", "fromstring", "iterparse", "XMLParser"})
 
     # lxml 的危险函数
-    LXML_DANGEROUS_FUNCS = {"parse", "fromstring", "XML", "HTML"}
+    LXML_DANGEROUS_FUNCS = frozenset({"parse", "fromstring", "XML", "HTML"})
 
     # xml.sax 的危险函数
-    SAX_DANGEROUS_FUNCS = {"parse", "parseString", "make_parser"}
-
-    def check(self, ast_tree: ast.AST, file_path: str, source_code: str) -> List[Vulnerability]:
-        vulnerabilities = []
-
-        for node in ast.walk(ast_tree):
-            vuln = None
-
-            if isinstance(node, ast.Call):
-                # 检测 xml.etree.ElementTree 调用
-                vuln = self._check_elementtree_call(node, file_path, source_code)
-
-                # 检测 lxml 调用
-                if not vuln:
-                    vuln = self._check_lxml_call(node, file_path, source_code)
-
-                # 检测 xml.sax 调用
-                if not vuln:
-                    vuln = self._check_sax_call(node, file_path, source_code)
-
-            if vuln:
-                vulnerabilities.append(vuln)
-
-        return vulnerabilities
-
-    def _check_elementtree_call(
-        self, node: ast.Call, file_path: str, source_code: str
-    ) -> Vulnerability:
-        """检测 xml.etree.ElementTree 的不安全调用"""
-        func_name = None
-        is_et_call = False
-
-        # 检查 ET.parse() / ElementTree.parse() 形式
-        if isinstance(node.func, ast.Attribute):
-            func_name = node.func.attr
-            if isinstance(node.func.value, ast.Name):
-                # ET.parse() 或 ElementTree.parse()
-                if node.func.value.id in ("ET", "ElementTree", "etree"):
-                    is_et_call = True
-            elif isinstance(node.func.value, ast.Attribute):
-                # xml.etree.ElementTree.parse()
-                if node.func.value.attr == "ElementTree":
-                    is_et_call = True
-
-        # 检查直接导入的函数调用 parse() / fromstring()
-        elif isinstance(node.func, ast.Name):
-            if node.func.id in self.ET_DANGEROUS_FUNCS:
-                func_name = node.func.id
-                # 这里假设直接调用的parse/fromstring来自ET模块（需要进一步分析导入）
-                is_et_call = True
-
-        if not is_et_call or func_name not in self.ET_DANGEROUS_FUNCS:
+    SAX_DANGEROUS_FUNCS = frozenset({"parse", "parseString", "make_parser"})
+
+    call_names = ET_DANGEROUS_FUNCS | LXML_DANGEROUS_FUNCS | SAX_DANGEROUS_FUNCS
+
+    # 各库需要检查的调用的完整名称（根部名称按导入展开后比较）
+    # xml.etree.ElementTree.parse()；未导入时按惯用名 ET、ElementTree、etree 判断
+    _ET_CALLS = frozenset(
+        f"{prefix}{func}"
+        for func in ET_DANGEROUS_FUNCS
+        for prefix in ("ET.", "ElementTree.", "etree.", "xml.etree.ElementTree.")
+    )
+    # etree.parse()、lxml.etree.parse()
+    _LXML_CALLS = frozenset(
+        f"{prefix}{func}" for func in LXML_DANGEROUS_FUNCS for prefix in ("etree.", "lxml.etree.")
+    )
+    # sax.parse()、xml.sax.parse()
+    _SAX_CALLS = frozenset(
+        f"{prefix}{func}" for func in SAX_DANGEROUS_FUNCS for prefix in ("sax.", "xml.sax.")
+    )
+
+    def visitors(self):
+        return {ast.Call: self._visit_call}
+
+    def _visit_call(self, node: ast.Call, ctx: RuleContext):
+        vuln = self._check_xml_call(node, ctx.imports["names"], ctx.file_path, ctx.source_code)
+        if vuln:
+            ctx.add(vuln)
+
+    def _check_xml_call(
+        self, node: ast.Call, names: Dict[str, str], file_path: str, source_code: str
+    ) -> Optional[Vulnerability]:
+        """检测 xml.etree.ElementTree、lxml 与 xml.sax 的不安全调用"""
+        call_name = resolved_name(node.func, names)
+        # 直接调用的 parse() 等只有从XML库导入时才检查，不再假设来自ET模块
+        if call_name is None or "." not in call_name:
             return None
+        func_name = call_name.rpartition(".")[2]
 
-        return self._create_vulnerability(
-            file_path=file_path,
-            line_number=node.lineno,
-            column=node.col_offset,
-            code_snippet=self._get_source_line(source_code, node.lineno),
-            description=f"使用 xml.etree.ElementTree.{func_name}() 解析XML，默认配置存在XXE风险",
-            suggestion="建议使用 defusedxml 库代替标准库解析XML。例如: import defusedxml.ElementTree as ET",
-            severity=self.severity,
-        )
+        # 检测 xml.etree.ElementTree 调用
+        if call_name in self._ET_CALLS:
+            description = f"使用 xml.etree.ElementTree.{func_name}() 解析XML，默认配置存在XXE风险"
+            suggestion = "建议使用 defusedxml 库代替标准库解析XML。例如: import defusedxml.ElementTree as ET"
 
-    def _check_lxml_call(self, node: ast.Call, file_path: str, source_code: str) -> Vulnerability:
-        """检测 lxml 的不安全调用"""
-        func_name = None
-        is_lxml_call = False
-
-        if isinstance(node.func, ast.Attribute):
-            func_name = node.func.attr
-
-            # 检查 etree.parse() / etree.fromstring() 形式
-            if isinstance(node.func.value, ast.Name):
-                if node.func.value.id == "etree":
-                    is_lxml_call = True
-            # 检查 lxml.etree.parse() 形式
-            elif isinstance(node.func.value, ast.Attribute):
-                if node.func.value.attr == "etree":
-                    if isinstance(node.func.value.value, ast.Name):
-                        if node.func.value.value.id == "lxml":
-                            is_lxml_call = True
-
-        if not is_lxml_call or func_name not in self.LXML_DANGEROUS_FUNCS:
-            return None
+        # 检测 lxml 调用，配置了安全选项时不报告
+        elif call_name in self._LXML_CALLS and not self._check_lxml_safe_config(node):
+            description = f"使用 lxml.etree.{func_name}() 解析XML，可能存在XXE风险"
+            suggestion = "建议使用 defusedxml 库，或配置 lxml 禁用外部实体: parser = etree.XMLParser(resolve_entities=False)"
 
-        # 检查是否有安全参数配置
-        has_safe_config = self._check_lxml_safe_config(node)
-        if has_safe_config:
+        # 检测 xml.sax 调用
+        elif call_name in self._SAX_CALLS:
+            description = f"使用 xml.sax.{func_name}() 解析XML，默认配置存在XXE风险"
+            suggestion = "建议使用 defusedxml.sax 代替标准库。例如: from defusedxml import sax"
+
+        else:
             return None
 
         return self._create_vulnerability(
@@ -123,8 +90,8 @@ class XXERule(BaseRule):
             line_number=node.lineno,
             column=node.col_offset,
             code_snippet=self._get_source_line(source_code, node.lineno),
-            description=f"使用 lxml.etree.{func_name}() 解析XML，可能存在XXE风险",
-            suggestion="建议使用 defusedxml 库，或配置 lxml 禁用外部实体: parser = etree.XMLParser(resolve_entities=False)",
+            description=description,
+            suggestion=suggestion,
             severity=self.severity,
         )
 
@@ -142,40 +109,3 @@ class XXERule(BaseRule):
                     if keyword.value.value is True:
                         return True
         return False
-
-    def _check_sax_call(self, node: ast.Call, file_path: str, source_code: str) -> Vulnerability:
-        """检测 xml.sax 的不安全调用"""
-        func_name = None
-        is_sax_call = False
-
-        if isinstance(node.func, ast.Attribute):
-            func_name = node.func.attr
-            # 检查 sax.parse() / sax.parseString() 形式
-            if isinstance(node.func.value, ast.Name):
-                if node.func.value.id == "sax":
-                    is_sax_call = True
-            # 检查 xml.sax.parse() 形式
-            elif isinstance(node.func.value, ast.Attribute):
-                if node.func.value.attr == "sax":
-                    if isinstance(node.func.value.value, ast.Name):
-                        if node.func.value.value.id == "xml":
-                            is_sax_call = True
-
-        # 检查直接导入的函数调用
-        elif isinstance(node.func, ast.Name):
-            if node.func.id in self.SAX_DANGEROUS_FUNCS:
-                func_name = node.func.id
-                is_sax_call = True
-
-        if not is_sax_call or func_name not in self.SAX_DANGEROUS_FUNCS:
-            return None
-
-        return self._create_vulnerability(
-            file_path=file_path,
-            line_number=node.lineno,
-            column=node.col_offset,
-            code_snippet=self._get_source_line(source_code, node.lineno),
-            description=f"使用 xml.sax.{func_name}() 解析XML，默认配置存在XXE风险",
-            suggestion="建议使用 defusedxml.sax 代替标准库。例如: from defusedxml import sax",
-            severity=self.severity,
-        )
@@ -0,0 +1,49 @@
+"""
+AST 缓存测试
+"""
+
+import ast
+import os
+import tempfile
+import unittest
+
+from pysec.cache import ASTCache
+
+
+class TestASTCache(unittest.TestCase):
+    """测试基于修改时间和大小的 AST 缓存"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self._tmp.name, "cache")
+        self.path = os.path.join(self._tmp.name, "a.py")
+        self._write("x = 1\n")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, content: str):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_disk_cache_hit(self):
+        """测试新的缓存实例可以读取磁盘缓存"""
+        ASTCache(cache_dir=self.cache_dir).set(self.path, ast.parse("x = 1\n"), "x = 1\n")
+        cached = ASTCache(cache_dir=self.cache_dir).get(self.path)
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached[1], "x = 1\n")
+        self.assertEqual(ast.dump(cached[0]), ast.dump(ast.parse("x = 1\n")))
+
+    def test_invalidated_on_mtime_change(self):
+        """测试文件修改时间变化后缓存失效"""
+        cache = ASTCache(cache_dir=self.cache_dir)
+        cache.set(self.path, ast.parse("x = 1\n"), "x = 1\n")
+        self._write("x = 2\n")
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertIsNone(cache.get(self.path))
+        self.assertIsNone(ASTCache(cache_dir=self.cache_dir).get(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
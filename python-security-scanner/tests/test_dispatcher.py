@@ -0,0 +1,229 @@
+"""
+测试 AST 单次遍历分发器
+"""
+
+import ast
+import os
+import unittest
+
+from pysec.engine import RuleEngine
+from pysec.rules.base import AstDispatcher, RuleContext, fast_walk, node_index, split_lines
+
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "samples")
+
+
+class TestAstDispatcher(unittest.TestCase):
+    """测试多规则共用一次遍历"""
+
+    def _load(self, name: str):
+        path = os.path.join(SAMPLES_DIR, name)
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        return path, source, ast.parse(source)
+
+    def test_engine_matches_individual_checks(self):
+        """测试引擎分发结果与逐规则 check 一致"""
+        engine = RuleEngine()
+        for name in (
+            "django_settings_vulnerable.py",
+            "flask_vulnerable.py",
+            "vulnerable_code.py",
+        ):
+            path, source, tree = self._load(name)
+            ctx = RuleContext(tree, path, source)
+            engine._dispatcher.run(ctx)
+            for rule in engine.rules:
+                if not rule.visitors():
+                    continue
+                expected = rule.check(tree, path, source)
+                actual = ctx.findings.get(rule.rule_id, [])
+                self.assertEqual(
+                    [(v.line_number, v.description) for v in expected],
+                    [(v.line_number, v.description) for v in actual],
+                )
+
+    def test_failing_handler_is_isolated(self):
+        """测试单个规则出错不影响其他规则"""
+        calls = []
+
+        def broken(node, ctx):
+            raise ValueError("boom")
+
+        dispatcher = AstDispatcher()
+        dispatcher.register(ast.Assign, broken, "BAD001")
+        dispatcher.register(ast.Assign, lambda node, ctx: calls.append(node), "OK001")
+
+        tree = ast.parse("a = 1\nb = 2\n")
+        ctx = RuleContext(tree, "test.py", "")
+        dispatcher.run(ctx)
+
+        self.assertIsInstance(ctx.errors["BAD001"], ValueError)
+        self.assertEqual(len(calls), 2)
+
+    def test_applies_to_skips_rule(self):
+        """测试 applies_to 返回 False 的规则不参与分发"""
+        engine = RuleEngine()
+        code = "DEBUG = True\n"
+        tree = ast.parse(code)
+        ctx = RuleContext(tree, "app/views.py", code)
+        engine._dispatcher.run(ctx)
+        self.assertNotIn("DJG001", ctx.findings)
+
+        ctx = RuleContext(tree, "app/settings.py", code)
+        engine._dispatcher.run(ctx)
+        self.assertEqual(len(ctx.findings["DJG001"]), 1)
+
+    def test_required_tokens_screen_source(self):
+        """测试源代码不含 required_tokens 时跳过规则"""
+        from pysec.rules.flask_security import FlaskTemplateInjectionRule
+
+        rule = FlaskTemplateInjectionRule()
+        code = "x = 1\n"
+        self.assertFalse(rule.applies_to(RuleContext(ast.parse(code), "a.py", code)))
+        code = "Markup(x)\n"
+        self.assertTrue(rule.applies_to(RuleContext(ast.parse(code), "a.py", code)))
+        self.assertTrue(rule.applies_to(RuleContext(ast.parse(code), "a.py", "")))
+
+    def test_required_pattern_screen_source(self):
+        """测试源代码不匹配 required_pattern 时跳过规则（忽略大小写）"""
+        from pysec.rules.hardcoded_secrets import HardcodedSecretsRule
+
+        rule = HardcodedSecretsRule()
+        code = "x = 'abcdefgh'\n"
+        self.assertFalse(rule.applies_to(RuleContext(ast.parse(code), "a.py", code)))
+        self.assertEqual(rule.check(ast.parse(code), "a.py", code), [])
+        code = "DB_PASSWORD = 'abcdefgh'\n"
+        self.assertTrue(rule.applies_to(RuleContext(ast.parse(code), "a.py", code)))
+        self.assertEqual(len(rule.check(ast.parse(code), "a.py", code)), 1)
+
+    def test_source_screen_keeps_findings(self):
+        """测试有检出的样例文件不会被文本筛选跳过"""
+        engine = RuleEngine()
+        for name in os.listdir(SAMPLES_DIR):
+            if name == "syntax_error.py" or not name.endswith(".py"):
+                continue
+            path, source, tree = self._load(name)
+            ctx = RuleContext(tree, path, source)
+            for rule in engine.rules:
+                if rule.check(tree, path, source):
+                    self.assertTrue(rule.applies_to(ctx), (name, rule.rule_id))
+
+        from pysec.rules.insecure_ssl import InsecureSSLRule
+
+        code = "import requests\nrequests.get(url)\n"
+        ctx = RuleContext(ast.parse(code), "a.py", code)
+        self.assertFalse(InsecureSSLRule().applies_to(ctx))
+
+    def test_call_names_filter_call_handlers(self):
+        """测试声明 call_names 的规则只收到名称匹配的调用"""
+        from pysec.rules.base import VisitorRule
+
+        class NamedRule(VisitorRule):
+            rule_id = "NAMED001"
+            call_names = frozenset({"open"})
+
+            def __init__(self, seen):
+                self.seen = seen
+
+            def visitors(self):
+                return {ast.Call: lambda node, ctx: self.seen.append(ast.unparse(node))}
+
+        seen, all_calls = [], []
+        dispatcher = AstDispatcher()
+        dispatcher.add_rule(NamedRule(seen))
+        dispatcher.register(ast.Call, lambda node, ctx: all_calls.append(node), "ALL001")
+
+        code = "open(p)\nf.open(q)\nclose(p)\nx()()\n"
+        dispatcher.run(RuleContext(ast.parse(code), "a.py", code))
+        self.assertEqual(seen, ["open(p)", "f.open(q)"])
+        self.assertEqual(len(all_calls), 5)
+
+    def test_cached_computes_once_per_file(self):
+        """测试文件级数据只计算一次"""
+        calls = []
+        ctx = RuleContext(ast.parse("a = 1\n"), "a.py", "a = 1\n")
+        for _ in range(3):
+            value = ctx.cached("lines", lambda: calls.append(1) or ["a = 1"])
+        self.assertEqual(value, ["a = 1"])
+        self.assertEqual(len(calls), 1)
+
+    def test_imports_shared_per_file(self):
+        """测试导入信息按文件收集一次"""
+        code = "import hashlib as h\nfrom random import randint as ri\n"
+        ctx = RuleContext(ast.parse(code), "a.py", code)
+        imports = ctx.imports
+        self.assertIs(ctx.imports, imports)
+        self.assertEqual(imports["names"], {"h": "hashlib", "ri": "random.randint"})
+        self.assertEqual(imports["from_aliases"], {"ri": ("random", "randint")})
+
+    def test_duplicate_findings_dropped(self):
+        """测试同一位置的重复问题只报告一次，不同问题都保留"""
+        engine = RuleEngine()
+        code = "DEBUG = DEBUG = True\n"
+        tree = ast.parse(code)
+        ctx = RuleContext(tree, "settings.py", code)
+        engine._dispatcher.run(ctx)
+        self.assertEqual(len(ctx.findings["DJG001"]), 1)
+
+        code = "def upload():\n    f = request.files['file']\n"
+        tree = ast.parse(code)
+        ctx = RuleContext(tree, "app.py", code)
+        engine._dispatcher.run(ctx)
+        self.assertEqual(len(ctx.findings["FLK005"]), 2)
+
+
+class TestNodeIndex(unittest.TestCase):
+    """测试节点类型索引"""
+
+    def test_buckets_follow_walk_order(self):
+        """测试分桶内容与 ast.walk 的过滤结果一致"""
+        tree = ast.parse("import os\nos.system(a)\nf(g(1))\nx = h()\n")
+        expected = [n for n in ast.walk(tree) if isinstance(n, ast.Call)]
+        self.assertEqual(list(node_index(tree).nodes(ast.Call)), expected)
+        self.assertEqual(tuple(node_index(tree).nodes(ast.With)), ())
+
+    def test_fast_walk_matches_ast_walk(self):
+        """测试 fast_walk 与 ast.walk 产出相同节点序列"""
+        for name in os.listdir(SAMPLES_DIR):
+            if name == "syntax_error.py" or not name.endswith(".py"):
+                continue
+            with open(os.path.join(SAMPLES_DIR, name), "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+            self.assertEqual(list(fast_walk(tree)), list(ast.walk(tree)))
+
+    def test_index_reused_for_same_tree(self):
+        """测试同一棵树只构建一次索引"""
+        tree = ast.parse("a = 1\n")
+        self.assertIs(node_index(tree), node_index(tree))
+        self.assertIsNot(node_index(tree), node_index(ast.parse("a = 1\n")))
+
+    def test_split_lines_reused_for_same_source(self):
+        """测试同一份源代码只拆分一次"""
+        source = "a = 1\r\nb = 2\n"
+        self.assertEqual(split_lines(source), source.splitlines())
+        self.assertIs(split_lines(source), split_lines(source))
+
+
+class TestFlaskFileUploadNesting(unittest.TestCase):
+    """测试嵌套函数中的文件上传检测"""
+
+    def test_nested_functions_counted_in_outer(self):
+        """测试外层函数的判断包含嵌套函数体"""
+        from pysec.rules.flask_security import FlaskFileUploadRule
+
+        source = (
+            "def outer():\n"
+            "    def inner():\n"
+            "        f = request.files['x']\n"
+            "        def deeper():\n"
+            "            return secure_filename(f.filename)\n"
+            "    return inner\n"
+        )
+        vulns = FlaskFileUploadRule().check(ast.parse(source), "app.py", source)
+        self.assertEqual(sorted(v.line_number for v in vulns), [1, 2])
+        self.assertTrue(all("secure_filename" not in v.description for v in vulns))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+规则验证器测试
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pysec.rule_validator import RuleValidator, ValidationErrorType, main, validate_rules
+
+
+VALID_RULE = '''
+rule_id = "ABC001"
+severity = "high"
+
+def check(tree):
+    pass
+'''
+
+
+class TestRuleValidatorCache(unittest.TestCase):
+    """测试规则校验结果缓存"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.rules_dir = os.path.join(self._tmp.name, "rules")
+        os.makedirs(self.rules_dir)
+        self.cache_file = os.path.join(self._tmp.name, "cache", "rules.json")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, name: str, content: str) -> str:
+        path = os.path.join(self.rules_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_cache_file_created(self):
+        """测试校验后写入缓存文件"""
+        path = self._write("a.py", VALID_RULE)
+        result = RuleValidator(cache_file=self.cache_file).validate_rule_file(path)
+        self.assertTrue(result.is_valid)
+        self.assertTrue(os.path.exists(self.cache_file))
+
+    def test_cache_disabled_by_default(self):
+        """测试默认不启用磁盘缓存"""
+        path = self._write("a.py", VALID_RULE)
+        cache_home = os.path.join(self._tmp.name, "xdg")
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}):
+            result = RuleValidator().validate_rule_file(path)
+        self.assertTrue(result.is_valid)
+        self.assertFalse(os.path.exists(cache_home))
+
+    def test_default_cache_file_honors_xdg(self):
+        """测试默认缓存文件位于 XDG_CACHE_HOME 下"""
+        path = self._write("a.py", VALID_RULE)
+        cache_home = os.path.join(self._tmp.name, "xdg")
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}):
+            RuleValidator(use_cache=True).validate_rule_file(path)
+        self.assertTrue(os.path.exists(os.path.join(cache_home, "pysec", "rules.json")))
+
+    def test_validate_rules_cache_opt_in(self):
+        """测试便捷函数默认不写缓存，use_cache=True 时写入默认缓存文件"""
+        self._write("a.py", VALID_RULE)
+        cache_home = os.path.join(self._tmp.name, "xdg")
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}), \
+                mock.patch("sys.stdout"):
+            validate_rules(self.rules_dir)
+            self.assertFalse(os.path.exists(cache_home))
+            result = validate_rules(self.rules_dir, use_cache=True)
+        self.assertTrue(result.is_valid)
+        self.assertTrue(os.path.exists(os.path.join(cache_home, "pysec", "rules.json")))
+
+    def test_command_line_cache_options(self):
+        """测试命令行入口的 --cache-file 与 --cache 选项"""
+        self._write("a.py", VALID_RULE)
+        cache_home = os.path.join(self._tmp.name, "xdg")
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}), \
+                mock.patch("sys.stdout"):
+            result = main([self.rules_dir, "--cache-file", self.cache_file])
+            self.assertTrue(result.is_valid)
+            self.assertTrue(os.path.exists(self.cache_file))
+            self.assertFalse(os.path.exists(cache_home))
+            main([self.rules_dir, "--cache"])
+        self.assertTrue(os.path.exists(os.path.join(cache_home, "pysec", "rules.json")))
+
+    def test_cached_result_matches(self):
+        """测试缓存命中时结果与首次校验一致"""
+        self._write("a.py", VALID_RULE)
+        self._write("b.json", '{"rule_id": "XYZ001", "severity": "bad"}')
+        first = RuleValidator(cache_file=self.cache_file).validate_rules_dir(self.rules_dir)
+        second = RuleValidator(cache_file=self.cache_file).validate_rules_dir(self.rules_dir)
+        self.assertEqual(first.is_valid, second.is_valid)
+        self.assertEqual(first.valid_rules, second.valid_rules)
+        self.assertEqual(
+            [(e.error_type, e.message) for e in first.errors],
+            [(e.error_type, e.message) for e in second.errors],
+        )
+
+    def test_duplicate_detected_on_cache_hit(self):
+        """测试缓存命中时仍检测跨文件的规则ID重复"""
+        self._write("a.py", VALID_RULE)
+        self._write("b.py", VALID_RULE)
+        RuleValidator(cache_file=self.cache_file).validate_rules_dir(self.rules_dir)
+        result = RuleValidator(cache_file=self.cache_file).validate_rules_dir(self.rules_dir)
+        types = [e.error_type for e in result.errors]
+        self.assertEqual(types.count(ValidationErrorType.DUPLICATE_RULE_ID), 1)
+        self.assertEqual(result.valid_rules, 1)
+
+    def test_cache_invalidated_on_change(self):
+        """测试文件修改后缓存失效"""
+        path = self._write("a.py", VALID_RULE)
+        RuleValidator(cache_file=self.cache_file).validate_rule_file(path)
+        self._write("a.py", VALID_RULE.replace('"high"', '"extreme"'))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        result = RuleValidator(cache_file=self.cache_file).validate_rule_file(path)
+        self.assertFalse(result.is_valid)
+        self.assertEqual(result.errors[0].error_type, ValidationErrorType.INVALID_SEVERITY)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+扫描增强模块测试
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pysec.scan_enhance import EnhancedScanner, Severity, _detect_file
+
+
+class TestDetectFile(unittest.TestCase):
+    """测试单文件关键字检测"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _detect(self, content: str):
+        path = os.path.join(self._tmp.name, "a.py")
+        # newline="" 保留原样的换行符（包括 CRLF）
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        return [(v.line, v.severity) for v in _detect_file(path)]
+
+    def test_crlf_line_numbers(self):
+        """测试 CRLF 换行的文件行号正确"""
+        content = "a = 1\r\nPASSWORD='x'\r\n\r\neval(a)\r\n"
+        self.assertEqual(
+            self._detect(content),
+            [(2, Severity.HIGH), (4, Severity.CRITICAL)],
+        )
+
+    def test_commented_credential_skipped(self):
+        """测试注释中的凭据不报告，且该行不再按危险函数报告"""
+        content = "  # secret=abc\n# key=1; eval(x)\nsecret=abc\n"
+        self.assertEqual(self._detect(content), [(3, Severity.HIGH)])
+
+    def test_last_line_without_newline(self):
+        """测试末行没有换行符时仍能检出"""
+        content = "x = 1\ny = os.system(cmd)"
+        self.assertEqual(self._detect(content), [(2, Severity.CRITICAL)])
+
+    def test_repeated_keyword_reported_once(self):
+        """测试同一行多次出现关键字只报告一次"""
+        content = "eval(a); eval(b); exec(c)\nkey=1; password=2\n"
+        self.assertEqual(
+            self._detect(content),
+            [(1, Severity.CRITICAL), (2, Severity.HIGH)],
+        )
+
+    def test_credential_takes_precedence(self):
+        """测试同一行同时命中凭据与危险函数时只按凭据报告"""
+        content = "api_key=eval(raw)\n"
+        self.assertEqual(self._detect(content), [(1, Severity.HIGH)])
+
+
+class TestEnhancedScannerParallel(unittest.TestCase):
+    """测试多进程扫描"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = self._tmp.name
+        os.makedirs(os.path.join(root, "pkg"))
+        for i in range(40):
+            with open(os.path.join(root, "pkg", f"m{i}.py"), "w", encoding="utf-8") as f:
+                f.write(f"x = {i}\n" + ("password='p'\n" if i % 3 == 0 else "") + "eval(x)\n" * (i % 2))
+        # 指向不存在文件的链接：能被找到但读取失败
+        self.broken = os.path.join(root, "pkg", "broken.py")
+        os.symlink(os.path.join(root, "missing.py"), self.broken)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _scan(self, jobs: int):
+        with mock.patch("sys.stdout"), mock.patch("sys.stderr"):
+            return EnhancedScanner(jobs=jobs).scan(self._tmp.name)
+
+    def test_parallel_scan_matches_serial(self):
+        """测试多进程扫描结果与串行扫描一致，读取失败的文件不计入已扫描"""
+        serial = self._scan(1)
+        parallel = self._scan(2)
+        self.assertEqual(parallel.vulnerabilities, serial.vulnerabilities)
+        self.assertGreater(len(serial.vulnerabilities), 0)
+        self.assertEqual(parallel.total_files, serial.total_files)
+        self.assertEqual(parallel.scanned_files, serial.scanned_files)
+        self.assertEqual(serial.total_files, 41)
+        self.assertEqual(serial.scanned_files, 40)
+        self.assertNotIn(self.broken, {v.file_path for v in parallel.vulnerabilities})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -53,6 +53,14 @@ class TestModels(unittest.TestCase):
         self.assertIsInstance(d, dict)
         self.assertEqual(d["rule_id"], "TEST001")
 
+    def test_vulnerability_has_no_instance_dict(self):
+        """测试漏洞对象在支持 slots 的版本上不带 __dict__"""
+        vuln = Vulnerability("R1", "N1", "high", "f.py", 1, 0, "c", "d", "s")
+        vuln.severity = "low"
+        self.assertEqual(vuln.severity, "low")
+        if sys.version_info >= (3, 10):
+            self.assertFalse(hasattr(vuln, "__dict__"))
+
     def test_scan_result_summary(self):
         """测试扫描结果统计"""
         vulns = [
@@ -152,6 +160,17 @@ class TestSecurityScanner(unittest.TestCase):
             # 注意：可能有一些误报，所以不断言为0
             self.assertLess(len(result.vulnerabilities), 10)
 
+    def test_parallel_scan_matches_serial(self):
+        """测试多进程扫描结果与串行扫描一致"""
+        serial = self.scanner.scan(str(self.samples_dir))
+        parallel = SecurityScanner(ScanConfig(jobs=2)).scan(str(self.samples_dir))
+        self.assertEqual(parallel.files_scanned, serial.files_scanned)
+        self.assertEqual(
+            [v.to_dict() for v in parallel.vulnerabilities],
+            [v.to_dict() for v in serial.vulnerabilities],
+        )
+        self.assertEqual(parallel.errors, serial.errors)
+
     def test_scan_code_snippet(self):
         """测试扫描代码片段"""
         code = "import os; os.system(user_input)"
@@ -270,6 +289,72 @@ with open(user_filename, 'r') as f:
         rule_ids = [v.rule_id for v in result.vulnerabilities]
         self.assertIn("PTH001", rule_ids)
 
+    def test_detect_unverified_ssl_context_via_alias(self):
+        """测试通过导入别名调用不安全的SSL上下文函数"""
+        code = """
+from ssl import _create_unverified_context as make_context
+ctx = make_context()
+"""
+        result = self.scanner.scan_code(code)
+        rule_ids = [v.rule_id for v in result.vulnerabilities]
+        self.assertIn("SSL001", rule_ids)
+
+    def test_detect_xxe_by_qualified_name(self):
+        """测试XXE按调用的完整名称检测，defusedxml 的同名函数不报告"""
+        code = """
+import xml.etree.ElementTree
+import defusedxml.ElementTree
+xml.etree.ElementTree.parse(path)
+defusedxml.ElementTree.parse(path)
+"""
+        result = self.scanner.scan_code(code)
+        lines = [v.line_number for v in result.vulnerabilities if v.rule_id == "XXE001"]
+        self.assertEqual(lines, [4])
+
+    def test_detect_xxe_resolves_imports(self):
+        """测试XXE按导入信息判断直接调用的函数来自哪个库"""
+        code = """
+from xml.sax import parseString
+from ast import parse
+from lxml import etree
+from xml.etree.ElementTree import parse as p, fromstring as fs
+parseString(data)
+parse(source)
+etree.fromstring(data)
+p(data)
+fs(data)
+"""
+        result = self.scanner.scan_code(code)
+        found = [
+            (v.line_number, v.description.split("(")[0])
+            for v in result.vulnerabilities
+            if v.rule_id == "XXE001"
+        ]
+        self.assertEqual(
+            found,
+            [
+                (6, "使用 xml.sax.parseString"),
+                (8, "使用 lxml.etree.fromstring"),
+                (9, "使用 xml.etree.ElementTree.parse"),
+                (10, "使用 xml.etree.ElementTree.fromstring"),
+            ],
+        )
+
+    def test_relative_imports_not_resolved_as_absolute(self):
+        """测试相对导入的本地模块不会被当作同名的标准库/第三方库"""
+        code = """
+from .sax import parse
+from .etree import fromstring
+from .ssl import _create_unverified_context as make_context
+parse(source)
+fromstring(data)
+make_context()
+"""
+        result = self.scanner.scan_code(code)
+        rule_ids = [v.rule_id for v in result.vulnerabilities]
+        self.assertNotIn("XXE001", rule_ids)
+        self.assertNotIn("SSL001", rule_ids)
+
 
 if __name__ == "__main__":
     unittest.main()